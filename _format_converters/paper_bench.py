@@ -0,0 +1,261 @@
+##################################################################
+# CONVERTER BENCHMARK WITH A STUB PANDOC
+#
+# Usage: python paper_bench.py [--docs 4] [--sizes 1,16,256] [--stub-delay 0.05]
+#                              [--output results.json]
+#
+# Generates a Markdown corpus (varying size, with and without images and
+# citations), puts a deterministic stand-in `pandoc` first on PATH and
+# times the converter's own overhead per stage and per mode (single,
+# batch, cached). Results are JSON so runs can be diffed across versions.
+##################################################################
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from paper_cache import BuildCache
+from paper_convert import convert_batch, convert_to_pdf, output_path
+from paper_metrics import StageTimer
+
+# Stand-in for pandoc: sleeps a fixed time and writes a fixed-size output
+STUB_PANDOC = '''\
+import sys, time
+args = sys.argv[1:]
+time.sleep({delay!r})
+if "-o" in args:
+    with open(args[args.index("-o") + 1], "wb") as f:
+        f.write(b"%PDF-1.4 stub\\n" * {output_lines!r})
+'''
+
+# Smallest valid PNG (1x1 transparent pixel)
+PNG_1X1 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d00000000"
+    "49454e44ae426082"
+)
+
+PARAGRAPH = (
+    "The estimates in column three remain stable once regional fixed effects "
+    "are included, and the coefficient of interest moves by less than one "
+    "standard error across specifications.\n\n"
+)
+
+
+def install_stub_pandoc(bin_dir, delay, output_lines=64):
+    """Write a `pandoc` stand-in into `bin_dir` and put it first on PATH."""
+    script = os.path.join(bin_dir, "stub_pandoc.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(STUB_PANDOC.format(delay=delay, output_lines=output_lines))
+
+    if os.name == "nt":
+        with open(os.path.join(bin_dir, "pandoc.cmd"), "w", encoding="utf-8") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        launcher = os.path.join(bin_dir, "pandoc")
+        with open(launcher, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(launcher, 0o755)
+
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+
+def generate_corpus(corpus_dir, docs_per_variant, sizes_kb):
+    """
+    Write Markdown documents for every (size, images, citations) variant.
+
+    Returns (list of document descriptions, bib path).
+    """
+    image_dir = os.path.join(corpus_dir, "figures")
+    os.makedirs(image_dir, exist_ok=True)
+    for i in range(4):
+        with open(os.path.join(image_dir, f"figure{i}.png"), "wb") as f:
+            f.write(PNG_1X1)
+
+    bib = os.path.join(corpus_dir, "refs.bib")
+    with open(bib, "w", encoding="utf-8") as f:
+        for i in range(20):
+            f.write(f"@article{{ref{i},\n  title = {{Paper {i}}},\n  year = {{20{i:02d}}}\n}}\n\n")
+
+    corpus = []
+    for size_kb in sizes_kb:
+        for images in (False, True):
+            for citations in (False, True):
+                for n in range(docs_per_variant):
+                    name = f"doc_{size_kb}kb_img{int(images)}_cit{int(citations)}_{n}.md"
+                    path = os.path.join(corpus_dir, name)
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(f"---\ntitle: \"{name}\"\n---\n\n# Introduction\n\n")
+                        written, section = 0, 0
+                        while written < size_kb * 1024:
+                            text = PARAGRAPH
+                            if citations:
+                                text = text.replace(".\n\n", f" [@ref{section % 20}].\n\n")
+                            if images and section % 8 == 0:
+                                text += f"![Figure {section}](figures/figure{section % 4}.png)\n\n"
+                            if section % 10 == 9:
+                                text += f"## Section {section}\n\n"
+                            f.write(text)
+                            written += len(text)
+                            section += 1
+                    corpus.append({
+                        "path": path,
+                        "size_kb": size_kb,
+                        "images": images,
+                        "citations": citations,
+                    })
+    return corpus, bib
+
+
+def summarize(samples):
+    """Mean/median/p95/max in milliseconds of a list of seconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def run_modes(corpus, bib, image_dir, work_dir, workers, header_dir):
+    """
+    Time single, batch and cached conversion of the whole corpus.
+
+    Returns ({mode: results}, single mode's StageTimer); each mode's results
+    include its per-stage timings as reported by the pipeline itself.
+    """
+    paths = [doc["path"] for doc in corpus]
+    modes = {}
+    timers = {mode: StageTimer() for mode in ("single", "batch", "cached")}
+
+    # Single: one convert_to_pdf call per document, no cache
+    out_dir = os.path.join(work_dir, "out_single")
+    os.makedirs(out_dir)
+    start = time.perf_counter()
+    for doc in corpus:
+        convert_to_pdf(
+            doc["path"], output_path(doc["path"], out_dir),
+            bib if doc["citations"] else None, None,
+            image_dir if doc["images"] else None,
+            interactive=False,
+            header_dir=header_dir,
+            timer=timers["single"]
+        )
+    modes["single"] = time.perf_counter() - start
+
+    # Batch: process pool, no cache
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        start = time.perf_counter()
+        convert_batch(paths, os.path.join(work_dir, "out_batch"), bib, None,
+                      image_dir, workers, header_dir=header_dir,
+                      timer=timers["batch"])
+        modes["batch"] = time.perf_counter() - start
+
+        # Cached: warm the cache, then time a full rebuild that only hits it
+        cache = BuildCache(os.path.join(work_dir, "cache"))
+        cached_out = os.path.join(work_dir, "out_cached")
+        convert_batch(paths, cached_out, bib, None, image_dir, workers, cache,
+                      header_dir=header_dir)
+        start = time.perf_counter()
+        convert_batch(paths, cached_out, bib, None, image_dir, workers, cache,
+                      header_dir=header_dir, timer=timers["cached"])
+        modes["cached"] = time.perf_counter() - start
+
+    results = {
+        mode: {
+            "docs": len(corpus),
+            "wall_s": round(seconds, 4),
+            "per_doc_ms": round(seconds / len(corpus) * 1000, 3),
+            "stages": {
+                stage: summarize(values)
+                for stage, values in timers[mode].by_stage().items()
+            },
+        }
+        for mode, seconds in modes.items()
+    }
+    return results, timers["single"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark paper_convert's overhead with a stub Pandoc."
+    )
+    parser.add_argument("--docs", type=int, default=4,
+                        help="Documents per (size, images, citations) variant")
+    parser.add_argument("--sizes", default="1,16,256",
+                        help="Comma separated document sizes in KB")
+    parser.add_argument("--stub-delay", type=float, default=0.05,
+                        help="Seconds the stub pandoc sleeps per call")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Batch pool size (default: CPU cores)")
+    parser.add_argument("--output", default=None,
+                        help="Write the JSON results here instead of stdout")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the generated corpus and outputs")
+
+    args = parser.parse_args()
+    sizes_kb = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix="paper_bench_")
+    try:
+        bin_dir = os.path.join(work_dir, "bin")
+        corpus_dir = os.path.join(work_dir, "corpus")
+        os.makedirs(bin_dir)
+        os.makedirs(corpus_dir)
+        install_stub_pandoc(bin_dir, args.stub_delay)
+
+        corpus, bib = generate_corpus(corpus_dir, args.docs, sizes_kb)
+        image_dir = os.path.join(corpus_dir, "figures")
+
+        # Like every cache and output below, headers live in work_dir, not
+        # in the user's real cache
+        header_dir = os.path.join(work_dir, "headers")
+        modes, single = run_modes(corpus, bib, image_dir, work_dir, args.workers, header_dir)
+
+        # Converter overhead (everything but Pandoc itself) by document size
+        size_of = {doc["path"]: doc["size_kb"] for doc in corpus}
+        by_size = {}
+        for input_file, stages in single.conversions:
+            overhead = sum(s for stage, s in stages.items() if stage != "subprocess")
+            by_size.setdefault(size_of[input_file], []).append(overhead)
+
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "stub_delay_s": args.stub_delay,
+                "docs": len(corpus),
+                "sizes_kb": sizes_kb,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "overhead_by_size_kb": {str(k): summarize(v) for k, v in sorted(by_size.items())},
+            "modes": modes,
+        }
+    finally:
+        if args.keep:
+            print(f"Kept benchmark files in {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = json.dumps(results, indent=2)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+##################################################################
+# CONTENT-ADDRESSED BUILD CACHE FOR paper_convert.py
+#
+# A conversion is keyed on the bytes of every input (markdown, bib,
+# logo, images, LaTeX header) plus the Pandoc options. On a hit the
+# cached output (PDF, HTML, DOCX or a parsed AST) is hard-linked (or
+# copied) into place instead of running Pandoc and LaTeX again.
+##################################################################
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PAPER_CONVERT_CACHE",
+    os.path.join(Path.home(), ".cache", "paper_convert")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(filepath, digest=None):
+    """Feed a file into `digest` (a new sha256 if None) in chunks and return it."""
+    digest = digest or hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def hash_tree(directory, digest=None):
+    """Feed every file below `directory` (relative path + bytes) into `digest`."""
+    digest = digest or hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            filepath = os.path.join(root, name)
+            digest.update(os.path.relpath(filepath, directory).encode("utf-8"))
+            hash_file(filepath, digest)
+    return digest
+
+
+def build_key(options, files=(), dirs=(), extra=()):
+    """
+    Compute the cache key of one conversion.
+
+    Parameters:
+    - options (list[str]): Pandoc options, without the input/output paths.
+    - files (iterable[str]): Files whose bytes affect the output.
+    - dirs (iterable[str]): Directories whose whole content affects the output.
+    - extra (iterable[str|bytes]): Any other content, e.g. the LaTeX header.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(options)).encode("utf-8"))
+    for filepath in files:
+        digest.update(b"\0file\0")
+        hash_file(filepath, digest)
+    for directory in dirs:
+        digest.update(b"\0dir\0")
+        hash_tree(directory, digest)
+    for item in extra:
+        digest.update(b"\0extra\0")
+        digest.update(item if isinstance(item, bytes) else item.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Persistent output cache with a size cap and least-recently-used eviction.
+
+    Entries live in `cache_dir/<key[:2]>/<key><suffix>`, the suffix being
+    the output's extension. The mtime of an entry is bumped on every hit,
+    so eviction drops the oldest mtimes first.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry(self, key, output_file):
+        suffix = Path(output_file).suffix
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix}")
+
+    def fetch(self, key, output_file):
+        """Place the cached output for `key` at `output_file`. Returns True on a hit."""
+        entry = self._entry(key, output_file)
+        if not os.path.isfile(entry):
+            return False
+
+        os.utime(entry)
+        if os.path.lexists(output_file):
+            os.remove(output_file)
+        try:
+            os.link(entry, output_file)
+        except OSError:
+            # Different filesystem or no hard-link support
+            shutil.copy2(entry, output_file)
+        return True
+
+    def store(self, key, output_file):
+        """Copy a freshly built `output_file` into the cache, then enforce the cap."""
+        entry = self._entry(key, output_file)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        # Write under a unique temp name (mkstemp) and rename, so concurrent
+        # processes and threads never see or clobber a half-written entry
+        fd, tmp_entry = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(entry))
+        os.close(fd)
+        try:
+            shutil.copyfile(output_file, tmp_entry)
+            # mkstemp creates owner-only files; entries are linked to outputs
+            shutil.copymode(output_file, tmp_entry)
+            os.replace(tmp_entry, entry)
+        except BaseException:
+            if os.path.exists(tmp_entry):
+                os.remove(tmp_entry)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Remove least-recently-used entries until the cache fits `max_bytes`."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            # Only the <key[:2]> shards hold entries, not e.g. the shared headers
+            if len(os.path.basename(root)) != 2:
+                continue
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                filepath = os.path.join(root, name)
+                try:
+                    st = os.stat(filepath)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filepath))
+                total += st.st_size
+
+        for _, size, filepath in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                # Already evicted by another worker
+                pass
+            total -= size
+
+    def clear(self):
+        """Drop every cached entry."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -1,34 +1,114 @@
 ##################################################################
 # CREATE parameters <sourcefile> <outputfile> <bib> <logo> <image-dir>
-# "example.md" "example.pdf"
+# "example.md" "example.pdf" OR "example.html" OR "example.docx"
 ##################################################################
 # 2025-08-14: ADDED Image handling to md as long as embdedd using '![]()'
+# 2026-10-18: ADDED Batch mode, pass a directory or glob as <sourcefile>
+# 2026-10-18: ADDED Build cache, unchanged documents skip Pandoc (--no-cache)
+# 2026-10-18: ADDED Incremental batch rebuilds from a dependency graph (--force)
+# 2026-10-18: ADDED Watch mode, rebuild on save with <sourcefile> a dir (--watch)
+# 2026-10-18: CHANGED LaTeX header is written once to the cache dir, not per call
+# 2026-10-18: ADDED Pre-flight FORMATTING_RULES check before Pandoc (--lint)
+# 2026-10-18: ADDED PDF, HTML and DOCX from one parse (--formats pdf,html,docx)
+# 2026-10-18: CHANGED Pandoc variables come from profiles in paper.yaml (--profile)
+# 2026-10-18: ADDED Per-conversion time/CPU/memory log (--metrics-log)
 # 
 ##################################################################
 import argparse
+import glob
+import json
 import subprocess
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from hashlib import sha256
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 
+from paper_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, BuildCache, build_key
+from paper_deps import DEFAULT_GRAPH_NAME, DependencyGraph, scan_dependencies
+from paper_metrics import (
+    MetricsLog, StageTimer, error_message, measure, merge_stages, merge_usage, run_measured, timed
+)
+from paper_lint import FORMATTING_RULES, fix_markdown, format_violation, lint_markdown
+from paper_profiles import (
+    DEFAULT_PROFILE, DEFAULT_PROFILES_FILE, describe_profiles, parse_overrides, resolve_profile,
+    writer_options
+)
 
-def convert_to_pdf(input_file, output_file, bib=None, logo=None, image_dir=None):
-    """
-    Convert a Markdown file to PDF using Pandoc with custom settings.
+# LaTeX preamble fragments, joined into one header shared by all conversions
+LATEX_HEADER_FRAGMENTS = {
+    # Default image scaling for PDF
+    "image_scale": r"""
+    \usepackage{graphicx}
+    \let\oldincludegraphics\includegraphics
+    \renewcommand{\includegraphics}[2][]{\oldincludegraphics[width=0.7\linewidth]{#2}}
+    """,
+    # Keep figures where they appear in the markdown
+    "float_placement": r"""
+    \usepackage{float}
+    \let\origfigure\figure
+    \let\endorigfigure\endfigure
+    \renewenvironment{figure}[1][]{\origfigure[H]}{\endorigfigure}
+    """,
+}
+LATEX_HEADER = "".join(LATEX_HEADER_FRAGMENTS.values())
 
-    Parameters:
-    - input_file (str): Path to the input Markdown file.
-    - output_file (str): Path to the output PDF file.
-    - bib (str, optional): Path to the bibliography file (.bib).
-      If None, no bibliography is added.
-    - logo (str, optional): Path to the logo file (.png).
-      If None, no logo is added.
-    - image_dir (str, optional): Path to directory containing images.
+OUTPUT_FORMATS = ("pdf", "html", "docx")
 
-    Example:
-      python convert_to_pdf.py "input.md" "output.pdf" --logo "path/to/logo.png"
+# Bump when the way headers are written changes, so old files are not reused
+HEADER_VERSION = 1
+
+
+def header_dir_for(cache_dir):
+    """Where the shared LaTeX headers live for a given build cache location."""
+    return os.path.join(cache_dir, "headers")
+
+
+HEADER_DIR = header_dir_for(DEFAULT_CACHE_DIR)
+
+
+def materialize_header(content, header_dir=HEADER_DIR):
     """
+    Write a LaTeX header once and return its path.
 
+    The file is named after the version and a hash of its content, so every
+    conversion with the same header shares one file and nothing is deleted
+    afterwards. It is written to a unique temp file (mkstemp) and renamed into
+    place, so concurrent processes and threads either see the complete file
+    or replace it with an identical one.
+    """
+    digest = sha256(content.encode("utf-8")).hexdigest()[:16]
+    header_path = os.path.join(header_dir, f"header-v{HEADER_VERSION}-{digest}.tex")
+    if os.path.isfile(header_path):
+        return header_path
+
+    os.makedirs(header_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=header_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, header_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header_path
+
+
+def show_output(output_file):
+    """Print where the output went and open it in the default viewer."""
+    # Feedback
+    print(f"This is your filepath:\n\n{os.path.abspath(output_file)}\n")
+    print(f"You can find your file here:\n{Path(output_file).parent}\n")
+
+    # Open the file automatically
+    start_command = f'start "" "{output_file}"'
+    subprocess.run(start_command, check=True, shell=True)
+
+
+def validate_inputs(input_file, bib=None, logo=None):
+    """Raise FileNotFoundError if the source or an optional input is missing."""
     # Check input file exists
     if not os.path.isfile(input_file):
         raise FileNotFoundError(f"Input file '{input_file}' not found.")
@@ -41,81 +121,501 @@ def convert_to_pdf(input_file, output_file, bib=None, logo=None, image_dir=None)
     if logo is not None and not os.path.isfile(logo):
         raise FileNotFoundError(f"Logo file '{logo}' not found.")
 
-    # Default image scaling for PDF
-    latex_image_scale = r"""
-    \usepackage{graphicx}
-    \usepackage{float}
-    \let\oldincludegraphics\includegraphics
-    \renewcommand{\includegraphics}[2][]{\oldincludegraphics[width=0.7\linewidth]{#2}}
-    \let\origfigure\figure
-    \let\endorigfigure\endfigure
-    \renewenvironment{figure}[1][]{\origfigure[H]}{\endorigfigure}
-    """
 
+def build_pandoc_options(bib=None, logo=None, image_dir=None, profile_options=None):
+    """
+    Build the Pandoc options shared by every output format.
 
-    with NamedTemporaryFile(delete=False, suffix=".tex") as tmp_header:
-        tmp_header.write(latex_image_scale.encode("utf-8"))
-        tmp_header_path = tmp_header.name
-
-    # Pandoc base command
-    pandoc_command = [
-        "pandoc", input_file,
-        "-o", output_file,
-        "--variable", "author:Mauricio Mandujano M.",
-        "--variable", "documentclass:article",
-        "--variable", "fontsize:12pt",
-        "--variable", "geometry:margin=.75in",
-        "--variable", "fontfamily:Libertinus",
-        "--variable", "mainfont:Times New Roman",
-        "--variable", "sansfont:Arial",
-        "--variable", "monofont:JetBrains Mono",
-        "--variable", "colorlinks:true",
-        "--variable", "linkcolor:blue",
-        "--variable", "urlcolor:cyan",
-        "--variable", "toc:true",
-        "--highlight-style=pygments",
-        "--include-in-header", tmp_header_path
-    ]
+    `profile_options` are the resolved arguments of a conversion profile
+    (see paper_profiles.resolve_profile); the default profile is used if None.
+    """
+    if profile_options is None:
+        profile_options = resolve_profile()
+    pandoc_options = list(profile_options)
 
     # Add bibliography if provided
     if bib is not None:
-        pandoc_command.extend([
-            "--bibliography", bib,
-            "--variable", "biblio-style:chicago"
-        ])
+        pandoc_options.extend(["--bibliography", bib])
 
     # Add logo if provided
     if logo is not None:
-        pandoc_command.extend(["--variable", f"logo:{logo}"])
+        pandoc_options.extend(["--variable", f"logo:{logo}"])
 
     # Add image directory support if provided
     if image_dir is not None:
-        pandoc_command.extend(["--resource-path", image_dir])
+        pandoc_options.extend(["--resource-path", image_dir])
+
+    return pandoc_options
+
+
+def format_options(output_format, header_dir=HEADER_DIR):
+    """Options only one output format needs, on top of `build_pandoc_options`."""
+    if output_format == "pdf":
+        return ["--include-in-header", materialize_header(LATEX_HEADER, header_dir)]
+    if output_format == "html":
+        return ["--standalone", "--toc"]
+    if output_format == "docx":
+        return ["--toc"]
+    raise ValueError(f"Unsupported output format '{output_format}'.")
+
+
+def preflight(input_file, lint="warn"):
+    """
+    Check the source against FORMATTING_RULES before Pandoc runs.
+
+    Returns the file to convert: the source itself, or with lint="fix" a
+    corrected temp copy that the caller must remove.
+    """
+    if lint == "off":
+        return input_file
+
+    violations = lint_markdown(input_file)
+    messages = [format_violation(input_file, n, rule) for n, rule in violations]
+    if messages and lint == "strict":
+        raise ValueError("Formatting rules violated:\n" + "\n".join(messages))
+    for message in messages:
+        print(("Fixed: " if lint == "fix" else "Warning: ") + message)
+
+    if violations and lint == "fix":
+        source, _ = fix_markdown(input_file)
+        return source
+    return input_file
+
+
+def key_inputs(input_file, bib=None, logo=None, image_dir=None):
+    """
+    Files whose bytes go into a conversion's cache key, besides the source.
+
+    These are the document's dependencies as the dependency graph sees them:
+    bib and logo, embedded images, metadata YAML and the files it names. So
+    any input that makes a document due for a rebuild also changes its key.
+    Missing files are left out; once they appear they change the key too.
+    """
+    return [f for f in scan_dependencies(input_file, (bib, logo), image_dir) if os.path.isfile(f)]
+
+
+def render(source, output_file, pandoc_options, reader="markdown", cache=None,
+           key_files=(), key_dirs=(), capture=False, usage=None, stages=None):
+    """
+    Run one Pandoc conversion, reusing a cached output when possible.
+
+    The cache key covers the bytes of `source`, `key_files` and `key_dirs`
+    plus the reader and options. If `usage` is a dict, the CPU time and peak
+    memory of Pandoc and LaTeX are added to it; if `stages` is a dict, the
+    wall time of the cache lookup, Pandoc run and cache store. Returns True
+    on a cache hit.
+    """
+    cache_key = None
+    if cache is not None:
+        with timed(stages, "cache_lookup"):
+            cache_key = build_key(
+                [reader, *pandoc_options],
+                files=[source, *(f for f in key_files if f is not None)],
+                dirs=[d for d in key_dirs if d is not None]
+            )
+            hit = cache.fetch(cache_key, output_file)
+        if hit:
+            return True
+
+    # A previous cache hit may have hard-linked the output to a cache entry;
+    # unlink it so Pandoc does not write through into the cache
+    if os.path.isfile(output_file) and os.stat(output_file).st_nlink > 1:
+        os.remove(output_file)
+
+    # Run Pandoc
+    pandoc_command = ["pandoc", source, "--from", reader, "-o", output_file, *pandoc_options]
+    with timed(stages, "subprocess"):
+        if usage is None:
+            subprocess.run(pandoc_command, check=True, capture_output=capture, text=True)
+        else:
+            _, child_usage = run_measured(pandoc_command, capture)
+            merge_usage(usage, child_usage)
+
+    if cache is not None:
+        with timed(stages, "post_processing"):
+            cache.store(cache_key, output_file)
+    return False
+
+
+def check_profile_formats(profile_options, formats):
+    """
+    Raise ValueError if the profile selects a writer and not only PDF is built.
+
+    Profile options are passed to every format, so e.g. the slides profile's
+    --to=beamer would write Beamer LaTeX into the .html and .docx files.
+    """
+    chosen = writer_options(profile_options or ())
+    if chosen and tuple(formats) != ("pdf",):
+        raise ValueError(
+            f"The profile sets {' '.join(chosen)}, which would apply to every output "
+            f"format; use it with --formats pdf only."
+        )
+
+
+def convert_to_pdf(input_file, output_file, bib=None, logo=None, image_dir=None,
+                   interactive=True, cache=None, lint="warn", profile_options=None,
+                   metrics=None, header_dir=None, timer=None):
+    """
+    Convert a Markdown file to PDF using Pandoc with custom settings.
+
+    Parameters:
+    - input_file (str): Path to the input Markdown file.
+    - output_file (str): Path to the output PDF file.
+    - bib (str, optional): Path to the bibliography file (.bib).
+      If None, no bibliography is added.
+    - logo (str, optional): Path to the logo file (.png).
+      If None, no logo is added.
+    - image_dir (str, optional): Path to directory containing images.
+    - interactive (bool, optional): Print feedback and open the PDF when done.
+      Set to False for batch runs; Pandoc errors are then captured.
+    - cache (BuildCache, optional): Reuse the PDF of an identical earlier build.
+      If None, Pandoc always runs.
+    - lint (str, optional): Pre-flight check against FORMATTING_RULES.
+      "warn" prints violations, "strict" raises ValueError before Pandoc runs,
+      "fix" converts a corrected copy, "off" skips the check.
+    - profile_options (tuple[str], optional): Resolved conversion profile,
+      see paper_profiles.resolve_profile. If None, the default profile.
+    - metrics (MetricsLog, optional): Append time, CPU, memory and size
+      figures of this conversion to a JSONL log. If None, nothing is recorded.
+    - header_dir (str, optional): Where the shared LaTeX header is written.
+      If None, the `headers` folder of `cache` (or of the default cache).
+    - timer (StageTimer, optional): Record the wall time of every stage of
+      this conversion, see paper_metrics.StageTimer. If None, nothing is timed.
+
+    Example:
+      python convert_to_pdf.py "input.md" "output.pdf" --logo "path/to/logo.png"
+    """
+    stages = None if timer is None else {}
+    with timed(stages, "validation"):
+        validate_inputs(input_file, bib, logo)
+    with timed(stages, "command_build"):
+        pandoc_options = build_pandoc_options(bib, logo, image_dir, profile_options)
+    if header_dir is None:
+        header_dir = header_dir_for(cache.cache_dir) if cache is not None else HEADER_DIR
+    with timed(stages, "header_write"):
+        pandoc_options += format_options("pdf", header_dir)
+    # Only the cache key needs the dependencies
+    with timed(stages, "dependency_scan"):
+        key_files = key_inputs(input_file, bib, logo, image_dir) if cache is not None else []
+
+    # Pre-flight: catch formatting problems before the expensive LaTeX run
+    with timed(stages, "lint"):
+        source = preflight(input_file, lint)
+
+    try:
+        with measure(metrics, input_file, [output_file]) as run:
+            cached = render(
+                source, output_file, pandoc_options,
+                cache=cache,
+                key_files=key_files,
+                key_dirs=[image_dir],
+                capture=not interactive,
+                usage=run.usage,
+                stages=stages
+            )
+            if cached:
+                run.status = "cached"
+        if timer is not None:
+            timer.record(input_file, stages)
+
+        if interactive:
+            if cached:
+                print("Up to date, reused the cached build.")
+            show_output(output_file)
+        return output_file
+
+    finally:
+        # Cleanup the corrected copy
+        if source != input_file and os.path.exists(source):
+            os.remove(source)
+
+
+def convert_formats(input_file, output_base, formats=OUTPUT_FORMATS, bib=None,
+                    logo=None, image_dir=None, interactive=True, cache=None,
+                    lint="warn", profile_options=None, metrics=None, header_dir=None,
+                    timer=None):
+    """
+    Convert a Markdown file to several formats from a single parse.
+
+    The source is read once into Pandoc's JSON AST (cached like any other
+    build output), then every format is rendered from the AST in parallel.
+
+    Parameters:
+    - input_file (str): Path to the input Markdown file.
+    - output_base (str): Output path without extension; `.pdf`, `.html` and
+      `.docx` are appended.
+    - formats (iterable[str]): Any of OUTPUT_FORMATS.
+    - bib, logo, image_dir, interactive, cache, lint, profile_options, metrics,
+      header_dir, timer: See `convert_to_pdf`. The stages of all formats are
+      added up per conversion.
+
+    Returns:
+    - dict of format -> output path.
+    """
+    stages = None if timer is None else {}
+    with timed(stages, "validation"):
+        validate_inputs(input_file, bib, logo)
+    with timed(stages, "command_build"):
+        pandoc_options = build_pandoc_options(bib, logo, image_dir, profile_options)
+        check_profile_formats(pandoc_options, formats)
+    outputs = {fmt: f"{output_base}.{fmt}" for fmt in formats}
+    if header_dir is None:
+        header_dir = header_dir_for(cache.cache_dir) if cache is not None else HEADER_DIR
+    with timed(stages, "header_write"):
+        render_options = {fmt: pandoc_options + format_options(fmt, header_dir) for fmt in outputs}
+    with timed(stages, "dependency_scan"):
+        key_files = key_inputs(input_file, bib, logo, image_dir) if cache is not None else []
+
+    with timed(stages, "lint"):
+        source = preflight(input_file, lint)
+    ast_file = f"{output_base}.{os.getpid()}.ast.json"
 
     try:
-        # Run Pandoc
-        subprocess.run(pandoc_command, check=True)
+        with measure(metrics, input_file, list(outputs.values())) as run:
+            # Parse once, unless the AST of these exact bytes is cached
+            hits = []
+            if len(outputs) > 1:
+                hits.append(render(source, ast_file, ["--to", "json"], cache=cache,
+                                   capture=not interactive, usage=run.usage, stages=stages))
+                reader, parsed = "json", ast_file
+            else:
+                reader, parsed = "markdown", source
 
-        # Feedback
-        print(f"This is your filepath:\n\n{os.path.abspath(output_file)}\n")
-        print(f"You can find your file here:\n{Path(output_file).parent}\n")
+            # Each render gets its own usage and stages dicts, merged once all are done
+            usages = {fmt: None if run.usage is None else {} for fmt in outputs}
+            render_stages = {fmt: None if stages is None else {} for fmt in outputs}
+            with ThreadPoolExecutor(max_workers=len(outputs)) as pool:
+                futures = [
+                    pool.submit(
+                        render, parsed, outputs[fmt], render_options[fmt], reader, cache,
+                        key_files, [image_dir], not interactive, usages[fmt], render_stages[fmt]
+                    )
+                    for fmt in outputs
+                ]
+                hits.extend(future.result() for future in futures)
 
-        # Open the file automatically
-        start_command = f'start "" "{output_file}"'
-        subprocess.run(start_command, check=True, shell=True)
+            if run.usage is not None:
+                for usage in usages.values():
+                    merge_usage(run.usage, usage)
+            if stages is not None:
+                for fmt_stages in render_stages.values():
+                    merge_stages(stages, fmt_stages)
+            if all(hits):
+                run.status = "cached"
+        if timer is not None:
+            timer.record(input_file, stages)
 
     finally:
-        # Cleanup temp LaTeX header file
-        if os.path.exists(tmp_header_path):
-            os.remove(tmp_header_path)
+        # Cleanup the AST and the corrected copy
+        for tmp_file in (ast_file, source if source != input_file else None):
+            if tmp_file is not None and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    if interactive:
+        for fmt, output_file in outputs.items():
+            print(f"{fmt.upper()}: {os.path.abspath(output_file)}")
+        if "pdf" in outputs:
+            show_output(outputs["pdf"])
+    return outputs
+
+
+def collect_inputs(source):
+    """
+    Resolve a directory or glob pattern into a sorted list of Markdown files.
+
+    A directory yields every `*.md` directly inside it; anything else is
+    treated as a glob pattern (use `**` with a recursive pattern).
+    """
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "*.md")
+    else:
+        pattern = source
+    return sorted(
+        f for f in glob.glob(pattern, recursive=True)
+        if f.endswith(".md") and os.path.isfile(f)
+    )
+
+
+def is_batch_source(source):
+    """True when <sourcefile> names a directory or a glob pattern."""
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def output_path(input_file, output_dir=None, output_format="pdf"):
+    """Output path for a source: `output_dir/<stem>.pdf`, or next to the source."""
+    out_dir = output_dir or os.path.dirname(input_file)
+    return os.path.join(out_dir, f"{Path(input_file).stem}.{output_format}")
+
+
+def batch_outputs(input_files, output_dir=None, output_format="pdf"):
+    """
+    Map every source of a batch to its output path.
+
+    Outputs go to `output_dir/<stem>.<format>` (or next to each source). When
+    two sources share a stem, e.g. `a/intro.md` and `b/intro.md` from a
+    recursive glob, each output keeps its source's folder relative to the
+    common source folder instead, so no two builds write the same file.
+    """
+    outputs = {src: output_path(src, output_dir, output_format) for src in input_files}
+    targets = {os.path.normcase(os.path.abspath(dst)) for dst in outputs.values()}
+    if output_dir is None or len(targets) == len(outputs):
+        return outputs
+
+    source_dirs = {src: os.path.dirname(os.path.abspath(src)) for src in input_files}
+    root = os.path.commonpath(list(source_dirs.values()))
+    return {
+        src: os.path.normpath(os.path.join(
+            output_dir, os.path.relpath(source_dirs[src], root), f"{Path(src).stem}.{output_format}"
+        ))
+        for src in input_files
+    }
+
+
+def build_config(bib=None, logo=None, image_dir=None, formats=("pdf",),
+                 profile_options=None, lint="warn"):
+    """
+    Options recorded in the dependency graph; a change forces a rebuild.
+
+    The lint mode is part of it: with "fix" Pandoc converts a corrected copy.
+    """
+    paths = [os.path.abspath(f) if f else None for f in (bib, logo, image_dir)]
+    return json.dumps([paths, list(formats), list(profile_options or ()), lint])
+
+
+def _convert_job(input_file, output_file, bib, logo, image_dir, cache, lint, formats,
+                 profile_options, metrics, header_dir, with_stages):
+    """
+    Worker entry point: convert one file and report (ok, error, seconds, timer),
+    timer being the StageTimer of this conversion if `with_stages`, else None.
+    """
+    timer = StageTimer() if with_stages else None
+    start = time.perf_counter()
+    try:
+        if tuple(formats) == ("pdf",):
+            convert_to_pdf(input_file, output_file, bib, logo, image_dir,
+                           interactive=False, cache=cache, lint=lint,
+                           profile_options=profile_options, metrics=metrics,
+                           header_dir=header_dir, timer=timer)
+        else:
+            convert_formats(input_file, os.path.splitext(output_file)[0], formats,
+                            bib, logo, image_dir, interactive=False, cache=cache,
+                            lint=lint, profile_options=profile_options, metrics=metrics,
+                            header_dir=header_dir, timer=timer)
+    except subprocess.CalledProcessError as e:
+        return False, error_message(e), time.perf_counter() - start, timer
+    except (OSError, ValueError) as e:
+        return False, str(e), time.perf_counter() - start, timer
+    return True, None, time.perf_counter() - start, timer
+
+
+def convert_batch(input_files, output_dir=None, bib=None, logo=None,
+                  image_dir=None, workers=None, cache=None, graph=None,
+                  lint="warn", formats=("pdf",), profile_options=None, metrics=None,
+                  header_dir=None, timer=None):
+    """
+    Convert many Markdown files to PDF (or several formats) concurrently.
+
+    Parameters:
+    - input_files (list[str]): Markdown files to convert.
+    - output_dir (str, optional): Where to write the PDFs. If None, each PDF
+      is written next to its source. Sources sharing a file name keep their
+      subfolder below it, see `batch_outputs`.
+    - bib, logo, image_dir: Shared by every document, see `convert_to_pdf`.
+    - workers (int, optional): Size of the process pool.
+      Defaults to the number of CPU cores.
+    - cache (BuildCache, optional): Shared build cache, see `convert_to_pdf`.
+    - graph (DependencyGraph, optional): Only convert documents whose source
+      or transitive inputs changed since the last build, and record the
+      inputs of every successful build. If None, everything is converted.
+    - lint (str, optional): Pre-flight check mode, see `convert_to_pdf`.
+    - formats (iterable[str], optional): Output formats, see `convert_formats`.
+    - profile_options (tuple[str], optional): Resolved conversion profile,
+      shared by every document. If None, the default profile.
+    - metrics (MetricsLog, optional): Shared metrics log, see `convert_to_pdf`.
+    - header_dir (str, optional): LaTeX header location, see `convert_to_pdf`.
+    - timer (StageTimer, optional): Collects the stage times of every
+      conversion from the workers, see `convert_to_pdf`.
+
+    Returns:
+    - list of (input_file, output_file, ok, error, seconds) for the files
+      that were converted, in input order.
+    """
+    formats = tuple(formats)
+    # Resolve the profile once here instead of once per document
+    if profile_options is None:
+        profile_options = resolve_profile()
+    jobs = batch_outputs(input_files, output_dir, formats[0])
+    if output_dir is not None:
+        for out_dir in {os.path.dirname(dst) for dst in jobs.values()}:
+            os.makedirs(out_dir, exist_ok=True)
+
+    stamps = {}
+    if graph is not None:
+        config = build_config(bib, logo, image_dir, formats, profile_options, lint)
+        jobs = {
+            src: dst for src, dst in jobs.items()
+            if graph.needs_rebuild(src, dst, config)
+        }
+        print(f"{len(input_files) - len(jobs)} of {len(input_files)} files up to date.")
+        # Stamp the inputs before building, so edits made during the build
+        # are picked up by the next run
+        stamps = {src: graph.snapshot(src, (bib, logo), image_dir) for src in jobs}
+        if not jobs:
+            return []
+
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    results = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _convert_job, src, dst, bib, logo, image_dir, cache, lint, formats,
+                profile_options, metrics, header_dir, timer is not None
+            ): src
+            for src, dst in jobs.items()
+        }
+        for future in as_completed(futures):
+            src = futures[future]
+            ok, error, seconds, job_timer = future.result()
+            if job_timer is not None:
+                timer.merge(job_timer)
+            results[src] = (src, jobs[src], ok, error, seconds)
+            status = "OK  " if ok else "FAIL"
+            print(f"[{status}] {src} ({seconds:.1f}s)" + (f": {error}" if error else ""))
+            if ok and graph is not None:
+                graph.record(src, jobs[src], stamps[src], config)
+
+    if graph is not None:
+        graph.save()
+
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results.values() if not r[2])
+    print(f"\nConverted {len(results) - failed}/{len(results)} files "
+          f"in {elapsed:.1f}s using {workers} workers.")
+
+    return [results[src] for src in input_files if src in results]
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Convert Markdown to PDF with custom Pandoc settings."
+        description="Convert Markdown to PDF with custom Pandoc settings.",
+        epilog=f"""
+Formatting Rules (checked by --lint):
+• Horizontal rules: Use '{FORMATTING_RULES['horizontal_rule']['correct']}' not '{FORMATTING_RULES['horizontal_rule']['wrong']}'
+• Negative numbers: Use '{FORMATTING_RULES['negative_numbers']['correct']}' not '{FORMATTING_RULES['negative_numbers']['wrong']}'
+        """,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "input_file", nargs="?", default=None,
+        help="Path to the input Markdown file, or a directory/glob for batch mode."
+    )
+    parser.add_argument(
+        "output_file", nargs="?", default=None,
+        help="Path to the output PDF file (single file mode only). With "
+             "--formats the extension is replaced per format."
     )
-    parser.add_argument("input_file", help="Path to the input Markdown file.")
-    parser.add_argument("output_file", help="Path to the output PDF file.")
     parser.add_argument(
         "--bib",
         help="Path to the bibliography file (.bib), set to None to omit",
@@ -131,16 +631,200 @@ if __name__ == "__main__":
         help="Path to directory containing images",
         default=None
     )
+    parser.add_argument(
+        "--profile",
+        help=f"Conversion profile to use (default: {DEFAULT_PROFILE}), see --list-profiles",
+        default=DEFAULT_PROFILE
+    )
+    parser.add_argument(
+        "--profiles-file",
+        help=f"YAML file with the conversion profiles (default: {DEFAULT_PROFILES_FILE})",
+        default=DEFAULT_PROFILES_FILE
+    )
+    parser.add_argument(
+        "-V", "--variable", action="append", metavar="KEY=VALUE",
+        help="Override a profile variable, can be repeated",
+        default=[]
+    )
+    parser.add_argument(
+        "--list-profiles", action="store_true",
+        help="Show the available conversion profiles and exit"
+    )
+    parser.add_argument(
+        "--out-dir",
+        help="Batch mode: directory for the PDFs (default: next to each source)",
+        default=None
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="Batch mode: number of parallel conversions (default: CPU cores)",
+        default=None
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always run Pandoc, even if an identical build is cached"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help=f"Build cache location (default: {DEFAULT_CACHE_DIR})",
+        default=DEFAULT_CACHE_DIR
+    )
+    parser.add_argument(
+        "--cache-size-mb", type=int,
+        help="Build cache size cap in MB; least recently used PDFs are evicted",
+        default=DEFAULT_MAX_BYTES // (1024 * 1024)
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Batch mode: convert every file, even if none of its inputs changed"
+    )
+    parser.add_argument(
+        "--formats",
+        help=f"Comma separated output formats out of {','.join(OUTPUT_FORMATS)}; "
+             "several formats share one Markdown parse (default: pdf)",
+        default="pdf"
+    )
+    parser.add_argument(
+        "--lint", choices=["warn", "strict", "fix", "off"],
+        help="Check the formatting rules before Pandoc: warn (default), stop on "
+             "violations (strict), convert a corrected copy (fix), or skip (off)",
+        default="warn"
+    )
+    parser.add_argument(
+        "--metrics-log",
+        help="Append timing, CPU, memory and size figures of every conversion "
+             "to this JSONL file (summarise with paper_metrics.py)",
+        default=None
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and rebuild PDFs when a source or its inputs change"
+    )
+    parser.add_argument(
+        "--debounce", type=float,
+        help="Watch mode: seconds to wait after the last save before rebuilding",
+        default=0.5
+    )
 
     args = parser.parse_args()
 
     try:
-        convert_to_pdf(
+        if args.list_profiles:
+            for name, description in describe_profiles(args.profiles_file):
+                print(f"{name:<12} {description}")
+            raise SystemExit(0)
+        profile_options = resolve_profile(
+            args.profile, parse_overrides(args.variable), args.profiles_file
+        )
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.input_file is None:
+        parser.error("input_file is required.")
+
+    formats = tuple(dict.fromkeys(f.strip().lower() for f in args.formats.split(",") if f.strip()))
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if not formats or unknown:
+        parser.error(f"--formats must be a subset of {', '.join(OUTPUT_FORMATS)}.")
+    try:
+        check_profile_formats(profile_options, formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+    metrics = MetricsLog(args.metrics_log) if args.metrics_log else None
+
+    cache = None
+    if not args.no_cache:
+        cache = BuildCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+    # The shared LaTeX header follows --cache-dir, even with --no-cache
+    header_dir = header_dir_for(args.cache_dir)
+
+    if args.watch:
+        if not os.path.isdir(args.input_file):
+            parser.error("--watch needs a directory as input_file.")
+        if formats != ("pdf",):
+            parser.error("--watch only builds PDFs.")
+
+        # Only needed here, so watchdog stays optional for the other modes
+        from paper_watch import watch
+
+        graph_dir = args.out_dir or args.input_file
+        watch(
             args.input_file,
-            args.output_file,
+            args.out_dir,
+            args.bib,
+            args.logo,
+            args.image_dir,
+            cache,
+            DependencyGraph(os.path.join(graph_dir, DEFAULT_GRAPH_NAME)),
+            args.debounce,
+            args.workers,
+            args.lint,
+            profile_options,
+            metrics,
+            header_dir
+        )
+        raise SystemExit(0)
+
+    if is_batch_source(args.input_file):
+        inputs = collect_inputs(args.input_file)
+        if not inputs:
+            parser.error(f"No Markdown files match '{args.input_file}'.")
+
+        graph = None
+        if not args.force:
+            graph_dir = args.out_dir or os.path.commonpath(
+                [os.path.dirname(os.path.abspath(f)) for f in inputs]
+            )
+            graph = DependencyGraph(os.path.join(graph_dir, DEFAULT_GRAPH_NAME))
+
+        results = convert_batch(
+            inputs,
+            args.out_dir,
             args.bib,
             args.logo,
-            args.image_dir
+            args.image_dir,
+            args.workers,
+            cache,
+            graph,
+            args.lint,
+            formats,
+            profile_options,
+            metrics,
+            header_dir
         )
-    except FileNotFoundError as e:
+        raise SystemExit(0 if all(r[2] for r in results) else 1)
+
+    if args.output_file is None:
+        parser.error("output_file is required when converting a single file.")
+
+    try:
+        if formats == ("pdf",):
+            convert_to_pdf(
+                args.input_file,
+                args.output_file,
+                args.bib,
+                args.logo,
+                args.image_dir,
+                cache=cache,
+                lint=args.lint,
+                profile_options=profile_options,
+                metrics=metrics,
+                header_dir=header_dir
+            )
+        else:
+            convert_formats(
+                args.input_file,
+                os.path.splitext(args.output_file)[0],
+                formats,
+                args.bib,
+                args.logo,
+                args.image_dir,
+                cache=cache,
+                lint=args.lint,
+                profile_options=profile_options,
+                metrics=metrics,
+                header_dir=header_dir
+            )
+    except (FileNotFoundError, ValueError) as e:
         print(f"Error: {e}")
@@ -0,0 +1,210 @@
+##################################################################
+# DEPENDENCY GRAPH FOR paper_convert.py
+#
+# Records, for every converted document, the files it was built from
+# (images embedded with '![]()', bibliographies, metadata YAML) and
+# their (size, mtime) at build time. A batch rebuild then only converts
+# documents whose transitive inputs changed, make-style.
+##################################################################
+import json
+import os
+import re
+
+import yaml
+
+DEFAULT_GRAPH_NAME = ".paper_deps.json"
+
+# ![alt](path "title"){attrs}  and  ![alt](<path with spaces>)
+IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\(\s*(<[^>]+>|[^)\s]+)')
+# <img src="path">
+HTML_IMAGE_PATTERN = re.compile(r'<img\s[^>]*src=["\']([^"\']+)["\']', re.IGNORECASE)
+# [ref]: path  (reference-style image targets)
+REFERENCE_PATTERN = re.compile(r'^\s{0,3}\[[^\]]+\]:\s*(<[^>]+>|\S+)')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".pdf", ".eps", ".tif", ".tiff")
+# Front matter / metadata keys that point at other input files
+FILE_KEYS = ("bibliography", "metadata-files", "metadata-file", "csl")
+
+
+def _is_remote(target):
+    """URLs and data URIs, but not Windows drive paths like C:\\figures."""
+    if re.match(r'^[a-zA-Z]:[\\/]', target):
+        return False
+    return re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*:', target) is not None
+
+
+def _resolve(target, search_dirs):
+    """Resolve a referenced path the way Pandoc's resource path would."""
+    target = target.strip("<>").split("#")[0]
+    if os.path.isabs(target):
+        return os.path.normpath(target)
+    for directory in search_dirs:
+        candidate = os.path.join(directory, target)
+        if os.path.exists(candidate):
+            return os.path.normpath(os.path.abspath(candidate))
+    # Not there (yet): record it so the document rebuilds once it appears
+    return os.path.normpath(os.path.abspath(os.path.join(search_dirs[0], target)))
+
+
+def _metadata_files(metadata):
+    """Yield the file names referenced by FILE_KEYS in a metadata mapping."""
+    if not isinstance(metadata, dict):
+        return
+    for key in FILE_KEYS:
+        value = metadata.get(key)
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str):
+                yield item
+
+
+def scan_yaml(yaml_file):
+    """Return the files a metadata YAML file references."""
+    try:
+        with open(yaml_file, "r", encoding="utf-8") as f:
+            metadata = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return []
+    search_dirs = [os.path.dirname(os.path.abspath(yaml_file))]
+    return [_resolve(name, search_dirs) for name in _metadata_files(metadata)]
+
+
+def scan_markdown(input_file, image_dir=None):
+    """
+    Return the files a Markdown document depends on.
+
+    Covers embedded images ('![]()', reference-style and <img>) and the
+    files named in the YAML front matter (bibliography, metadata-files, csl).
+    Code blocks are skipped. The file is streamed line by line.
+    """
+    source_dir = os.path.dirname(os.path.abspath(input_file))
+    search_dirs = [source_dir, os.getcwd()]
+    if image_dir is not None:
+        search_dirs.append(image_dir)
+
+    targets = []
+    front_matter = []
+    in_front_matter = False
+    in_fence = False
+
+    with open(input_file, "r", encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f):
+            if line_number == 0 and line.rstrip() == "---":
+                in_front_matter = True
+                continue
+            if in_front_matter:
+                if line.rstrip() in ("---", "..."):
+                    in_front_matter = False
+                else:
+                    front_matter.append(line)
+                continue
+
+            if FENCE_PATTERN.match(line):
+                in_fence = not in_fence
+            if in_fence:
+                continue
+
+            targets.extend(IMAGE_PATTERN.findall(line))
+            targets.extend(HTML_IMAGE_PATTERN.findall(line))
+            reference = REFERENCE_PATTERN.match(line)
+            if reference and reference.group(1).strip("<>").lower().endswith(IMAGE_SUFFIXES):
+                targets.append(reference.group(1))
+
+    deps = [_resolve(t, search_dirs) for t in targets if not _is_remote(t.strip("<>"))]
+
+    if front_matter:
+        try:
+            metadata = yaml.safe_load("".join(front_matter))
+        except yaml.YAMLError:
+            metadata = None
+        deps.extend(_resolve(name, [source_dir]) for name in _metadata_files(metadata))
+
+    return list(dict.fromkeys(deps))
+
+
+def scan_dependencies(input_file, extra=(), image_dir=None):
+    """
+    Return the transitive dependencies of a document, itself excluded.
+
+    Parameters:
+    - input_file (str): Markdown source.
+    - extra (iterable[str]): Files passed on the command line (bib, logo, ...).
+    - image_dir (str, optional): Extra directory used to resolve images.
+    """
+    seen = {}
+    pending = scan_markdown(input_file, image_dir)
+    pending.extend(os.path.abspath(f) for f in extra if f is not None)
+
+    while pending:
+        dep = pending.pop()
+        if dep in seen:
+            continue
+        seen[dep] = True
+        if dep.endswith((".yaml", ".yml")) and os.path.isfile(dep):
+            pending.extend(scan_yaml(dep))
+
+    return sorted(seen)
+
+
+def stamp(filepath):
+    """(size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class DependencyGraph:
+    """
+    Persistent map of document -> inputs, stored as JSON.
+
+    Each entry keeps the output path, a configuration string (the options
+    the document was built with) and the stamp of the source and of every
+    transitive dependency at build time.
+    """
+
+    def __init__(self, graph_file):
+        self.graph_file = graph_file
+        self.docs = {}
+        if os.path.isfile(graph_file):
+            try:
+                with open(graph_file, "r", encoding="utf-8") as f:
+                    self.docs = json.load(f).get("docs", {})
+            except (OSError, ValueError):
+                # Corrupt graph: start over, everything gets rebuilt
+                self.docs = {}
+
+    def needs_rebuild(self, input_file, output_file, config=""):
+        """True if the document, its output or any of its inputs changed."""
+        entry = self.docs.get(os.path.abspath(input_file))
+        if entry is None or entry["config"] != config:
+            return True
+        if entry["output"] != os.path.abspath(output_file) or not os.path.isfile(output_file):
+            return True
+        return any(stamp(path) != recorded for path, recorded in entry["stamps"].items())
+
+    def snapshot(self, input_file, extra=(), image_dir=None):
+        """Scan a document and stamp it and its inputs. Take this before building."""
+        input_file = os.path.abspath(input_file)
+        paths = [input_file] + scan_dependencies(input_file, extra, image_dir)
+        return {path: stamp(path) for path in paths}
+
+    def record(self, input_file, output_file, stamps, config=""):
+        """Store a successful build, with the stamps taken by `snapshot`."""
+        self.docs[os.path.abspath(input_file)] = {
+            "output": os.path.abspath(output_file),
+            "config": config,
+            "stamps": stamps,
+        }
+
+    def dependents(self, filepath):
+        """Documents that were built from `filepath` (including the document itself)."""
+        filepath = os.path.abspath(filepath)
+        return sorted(doc for doc, entry in self.docs.items() if filepath in entry["stamps"])
+
+    def save(self):
+        tmp_file = f"{self.graph_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "docs": self.docs}, f, indent=1)
+        os.replace(tmp_file, self.graph_file)
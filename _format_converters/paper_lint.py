@@ -0,0 +1,149 @@
+##################################################################
+# PRE-FLIGHT MARKDOWN LINTER FOR paper_convert.py
+#
+# Usage: python paper_lint.py <sourcefile> [--fix <outputfile>]
+#
+# Catches the FORMATTING_RULES problems before Pandoc and LaTeX run,
+# streaming the file in chunks so large sources stay cheap.
+##################################################################
+import argparse
+import os
+import sys
+from tempfile import NamedTemporaryFile
+
+# CONSTANTS - Single source of truth for all help information
+FORMATTING_RULES = {
+    'horizontal_rule': {
+        'wrong': '---',
+        'correct': '***',
+        'reason': 'creates YAML parsing errors'
+    },
+    'negative_numbers': {
+        'wrong': '−3.83',  # Unicode minus U+2212
+        'correct': '-3.83',  # Regular hyphen U+002D
+        'reason': 'causes LaTeX Unicode errors'
+    }
+}
+
+UNICODE_MINUS = "−".encode("utf-8")
+HYPHEN = b"-"
+FENCES = (b"```", b"~~~")
+# A chunk without any of these cannot contain a violation or change state
+MARKERS = (b"---", UNICODE_MINUS) + FENCES
+CHUNK_SIZE = 1024 * 1024
+
+
+def _scan(source, fixed=None):
+    """
+    Stream `source` and yield (line_number, rule) for every violation.
+
+    If `fixed` is an open binary file, the corrected text is written to it.
+    The file is read in chunks cut at line boundaries; chunks without any
+    marker are skipped with a byte search, the rest is checked line by line.
+    """
+    line_number = 0
+    in_front_matter = False
+    in_fence = False
+    previous_blank = True
+
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if not chunk.endswith(b"\n"):
+                chunk += f.readline()
+
+            # Fast path, the first chunk is always checked for front matter
+            if line_number and not in_front_matter and not any(m in chunk for m in MARKERS):
+                line_number += chunk.count(b"\n")
+                last_line = chunk[:-1] if chunk.endswith(b"\n") else chunk
+                previous_blank = not last_line.rsplit(b"\n", 1)[-1].strip()
+                if fixed is not None:
+                    fixed.write(chunk)
+                continue
+
+            for line in chunk.splitlines(keepends=True):
+                line_number += 1
+                stripped = line.strip()
+
+                # YAML front matter delimiters are the one legitimate '---'
+                if line_number == 1 and stripped == b"---":
+                    in_front_matter = True
+                elif in_front_matter:
+                    if stripped in (b"---", b"..."):
+                        in_front_matter = False
+                elif stripped.startswith(FENCES):
+                    in_fence = not in_fence
+                elif not in_fence and stripped == b"---" and previous_blank:
+                    # After a text line '---' is a setext heading, after a blank
+                    # line Pandoc tries to read it as a YAML block
+                    yield line_number, "horizontal_rule"
+                    line = line.replace(b"---", b"***", 1)
+
+                if UNICODE_MINUS in line:
+                    yield line_number, "negative_numbers"
+                    line = line.replace(UNICODE_MINUS, HYPHEN)
+
+                previous_blank = not stripped
+                if fixed is not None:
+                    fixed.write(line)
+
+
+def lint_markdown(source):
+    """Return a list of (line_number, rule) violations in `source`."""
+    return list(_scan(source))
+
+
+def fix_markdown(source, output_file=None):
+    """
+    Write a corrected copy of `source` and return (path, violations).
+
+    If `output_file` is None the copy is a temp file next to the source,
+    so relative image paths resolve the same way; the caller removes it.
+    It does not end in '.md', so batch and watch mode never pick it up.
+    """
+    if output_file is None:
+        with NamedTemporaryFile(
+            delete=False, suffix=".lint.tmp", prefix=".",
+            dir=os.path.dirname(os.path.abspath(source))
+        ) as fixed:
+            violations = list(_scan(source, fixed))
+        return fixed.name, violations
+
+    with open(output_file, "wb") as fixed:
+        violations = list(_scan(source, fixed))
+    return output_file, violations
+
+
+def format_violation(source, line_number, rule):
+    """One-line report, e.g. `paper.md:12: use '***' not '---' (creates YAML parsing errors)`."""
+    info = FORMATTING_RULES[rule]
+    return (f"{source}:{line_number}: use '{info['correct']}' not '{info['wrong']}' "
+            f"({info['reason']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check a Markdown file against the paper_convert formatting rules."
+    )
+    parser.add_argument("input_file", help="Path to input Markdown file")
+    parser.add_argument("--fix", help="Write a corrected copy to this path", default=None)
+
+    args = parser.parse_args()
+
+    if args.fix is not None:
+        _, violations = fix_markdown(args.input_file, args.fix)
+    else:
+        violations = lint_markdown(args.input_file)
+
+    for line_number, rule in violations:
+        print(format_violation(args.input_file, line_number, rule))
+
+    if args.fix is not None:
+        print(f"Fixed {len(violations)} issue(s), corrected copy: {args.fix}")
+    sys.exit(1 if violations and args.fix is None else 0)
+
+
+if __name__ == "__main__":
+    main()
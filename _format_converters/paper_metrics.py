@@ -0,0 +1,416 @@
+##################################################################
+# CONVERSION METRICS FOR paper_convert.py
+#
+# Usage: python paper_metrics.py <metrics.jsonl> [--top 10]
+#
+# With --metrics-log, paper_convert appends one JSON line per conversion:
+# wall time, CPU time and peak memory of Pandoc and its LaTeX children
+# (os.wait4 on POSIX, a Job Object on Windows), input and output size.
+# This script summarises such a log: the slowest documents and the
+# distribution of build times.
+##################################################################
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from tempfile import TemporaryFile
+
+
+NO_USAGE = {"cpu_user_s": None, "cpu_sys_s": None, "max_rss_kb": None}
+
+
+def run_measured(command, capture=False):
+    """
+    Run `command` like subprocess.run(check=True) and measure its resources.
+
+    Returns (CompletedProcess, usage) where usage holds the child's CPU time
+    and peak memory, descendants such as the LaTeX engine included. POSIX
+    reports them via os.wait4 (peak RSS); Windows via a Job Object (peak
+    committed memory of any process in the job). Elsewhere those fields are None.
+    """
+    if not hasattr(os, "wait4") and os.name != "nt":
+        result = subprocess.run(command, check=True, capture_output=capture, text=True)
+        return result, dict(NO_USAGE)
+
+    # Files rather than pipes, so the child can be waited for without a
+    # reader thread and without risking a full pipe
+    out = TemporaryFile("w+") if capture else None
+    err = TemporaryFile("w+") if capture else None
+    try:
+        if hasattr(os, "wait4"):
+            proc = subprocess.Popen(command, stdout=out, stderr=err, text=True)
+            _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            usage = {
+                "cpu_user_s": round(rusage.ru_utime, 4),
+                "cpu_sys_s": round(rusage.ru_stime, 4),
+                # ru_maxrss is in KB on Linux, in bytes on macOS
+                "max_rss_kb": rusage.ru_maxrss // 1024 if os.uname().sysname == "Darwin" else rusage.ru_maxrss,
+            }
+        else:
+            with WindowsJob() as job:
+                proc = subprocess.Popen(command, stdout=out, stderr=err, text=True)
+                job.assign(proc)
+                proc.wait()
+                usage = job.usage()
+
+        stdout = stderr = None
+        if capture:
+            out.seek(0)
+            err.seek(0)
+            stdout, stderr = out.read(), err.read()
+    finally:
+        for f in (out, err):
+            if f is not None:
+                f.close()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, command, stdout, stderr)
+    return subprocess.CompletedProcess(command, proc.returncode, stdout, stderr), usage
+
+
+class WindowsJob:
+    """
+    Windows Job Object that accounts for a process and every child it starts.
+
+    Pandoc runs LaTeX as a child process, so per-process counters would miss
+    most of the work; the job's accounting covers the whole tree. Children
+    started before `assign` are not counted (Pandoc starts LaTeX much later).
+    If the job cannot be created or assigned, `usage` reports None fields.
+    """
+
+    # JOBOBJECTINFOCLASS values
+    BASIC_ACCOUNTING = 1
+    EXTENDED_LIMIT = 9
+
+    def __enter__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class BasicAccounting(ctypes.Structure):
+            _fields_ = [
+                ("TotalUserTime", ctypes.c_int64),
+                ("TotalKernelTime", ctypes.c_int64),
+                ("ThisPeriodTotalUserTime", ctypes.c_int64),
+                ("ThisPeriodTotalKernelTime", ctypes.c_int64),
+                ("TotalPageFaultCount", wintypes.DWORD),
+                ("TotalProcesses", wintypes.DWORD),
+                ("ActiveProcesses", wintypes.DWORD),
+                ("TotalTerminatedProcesses", wintypes.DWORD),
+            ]
+
+        class BasicLimit(ctypes.Structure):
+            _fields_ = [
+                ("PerProcessUserTimeLimit", ctypes.c_int64),
+                ("PerJobUserTimeLimit", ctypes.c_int64),
+                ("LimitFlags", wintypes.DWORD),
+                ("MinimumWorkingSetSize", ctypes.c_size_t),
+                ("MaximumWorkingSetSize", ctypes.c_size_t),
+                ("ActiveProcessLimit", wintypes.DWORD),
+                ("Affinity", ctypes.c_size_t),
+                ("PriorityClass", wintypes.DWORD),
+                ("SchedulingClass", wintypes.DWORD),
+            ]
+
+        class ExtendedLimit(ctypes.Structure):
+            _fields_ = [
+                ("BasicLimitInformation", BasicLimit),
+                ("IoInfo", ctypes.c_uint64 * 6),
+                ("ProcessMemoryLimit", ctypes.c_size_t),
+                ("JobMemoryLimit", ctypes.c_size_t),
+                ("PeakProcessMemoryUsed", ctypes.c_size_t),
+                ("PeakJobMemoryUsed", ctypes.c_size_t),
+            ]
+
+        self.ctypes = ctypes
+        self.structures = (BasicAccounting, ExtendedLimit)
+        self.kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self.kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+        self.kernel32.CreateJobObjectW.argtypes = (ctypes.c_void_p, wintypes.LPCWSTR)
+        self.kernel32.AssignProcessToJobObject.argtypes = (wintypes.HANDLE, wintypes.HANDLE)
+        self.kernel32.QueryInformationJobObject.argtypes = (
+            wintypes.HANDLE, ctypes.c_int, ctypes.c_void_p, wintypes.DWORD, ctypes.c_void_p
+        )
+        self.kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+
+        self.handle = self.kernel32.CreateJobObjectW(None, None)
+        self.assigned = False
+        return self
+
+    def assign(self, proc):
+        if self.handle:
+            self.assigned = bool(self.kernel32.AssignProcessToJobObject(self.handle, int(proc._handle)))
+
+    def _query(self, info_class, structure):
+        info = structure()
+        ok = self.kernel32.QueryInformationJobObject(
+            self.handle, info_class, self.ctypes.byref(info), self.ctypes.sizeof(info), None
+        )
+        return info if ok else None
+
+    def usage(self):
+        """CPU times and peak memory of the job's processes, in usage-dict form."""
+        if not self.assigned:
+            return dict(NO_USAGE)
+        basic_accounting, extended_limit = self.structures
+        accounting = self._query(self.BASIC_ACCOUNTING, basic_accounting)
+        limits = self._query(self.EXTENDED_LIMIT, extended_limit)
+        return {
+            # Job times are in 100 ns units
+            "cpu_user_s": round(accounting.TotalUserTime / 1e7, 4) if accounting else None,
+            "cpu_sys_s": round(accounting.TotalKernelTime / 1e7, 4) if accounting else None,
+            "max_rss_kb": limits.PeakProcessMemoryUsed // 1024 if limits else None,
+        }
+
+    def __exit__(self, *exc_info):
+        if self.handle:
+            self.kernel32.CloseHandle(self.handle)
+        return False
+
+
+def merge_usage(total, usage):
+    """Add one subprocess' usage into a running total (CPU sums, RSS peaks)."""
+    for key in ("cpu_user_s", "cpu_sys_s"):
+        if usage.get(key) is not None:
+            total[key] = round((total.get(key) or 0) + usage[key], 4)
+    if usage.get("max_rss_kb") is not None:
+        total["max_rss_kb"] = max(total.get("max_rss_kb") or 0, usage["max_rss_kb"])
+    return total
+
+
+def error_message(error):
+    """
+    Short description of a failed conversion.
+
+    For a failed Pandoc run its last stderr line if captured; for any other
+    error (e.g. Pandoc not installed) the exception's own message.
+    """
+    if not isinstance(error, subprocess.CalledProcessError):
+        return str(error) or type(error).__name__
+    detail = (error.stderr or "").strip().splitlines()
+    return detail[-1] if detail else f"pandoc exited with {error.returncode}"
+
+
+class Measurement:
+    """What a conversion reports back to `measure`: cache status and child usage."""
+
+    def __init__(self, enabled):
+        self.status = "built"
+        self.usage = {} if enabled else None
+
+
+@contextmanager
+def measure(metrics, input_file, outputs):
+    """
+    Time the block and append a record to `metrics` (a MetricsLog, or None).
+
+    The block sets `.status = "cached"` on a cache hit and passes `.usage`
+    to `render`, which fills in the Pandoc/LaTeX resource usage. Failed
+    conversions are recorded too, whatever the error (a failed Pandoc run,
+    Pandoc missing, ...), then re-raised.
+    """
+    measurement = Measurement(metrics is not None)
+    if metrics is None:
+        yield measurement
+        return
+
+    start = time.perf_counter()
+    try:
+        yield measurement
+    except Exception as e:
+        metrics.record(input_file, outputs, "failed", time.perf_counter() - start,
+                       measurement.usage, error_message(e))
+        raise
+    metrics.record(input_file, outputs, measurement.status, time.perf_counter() - start,
+                   measurement.usage)
+
+
+class StageTimer:
+    """
+    Wall time of each stage of every conversion, for benchmarks.
+
+    Pass one as `timer` to convert_to_pdf, convert_formats or convert_batch.
+    Each successful conversion adds (input file, {stage: seconds}) with the
+    STAGES that ran; e.g. a cache hit has no "subprocess" stage.
+    """
+
+    STAGES = (
+        "validation", "command_build", "header_write", "dependency_scan",
+        "lint", "cache_lookup", "subprocess", "post_processing",
+    )
+
+    def __init__(self):
+        self.conversions = []
+
+    def record(self, input_file, stages):
+        self.conversions.append((input_file, stages))
+
+    def merge(self, other):
+        """Add the conversions timed by another timer, e.g. in a batch worker."""
+        self.conversions.extend(other.conversions)
+
+    def by_stage(self):
+        """{stage: [seconds per conversion]}, in STAGES order."""
+        samples = {stage: [] for stage in self.STAGES}
+        for _, stages in self.conversions:
+            for stage, seconds in stages.items():
+                samples.setdefault(stage, []).append(seconds)
+        return {stage: values for stage, values in samples.items() if values}
+
+
+@contextmanager
+def timed(stages, name):
+    """Add the wall time of the block to stages[name]; a no-op if `stages` is None."""
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def merge_stages(total, stages):
+    """Add one render's stage times into a conversion's (like merge_usage)."""
+    for stage, seconds in stages.items():
+        total[stage] = total.get(stage, 0.0) + seconds
+    return total
+
+
+def file_size(filepath):
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return None
+
+
+class MetricsLog:
+    """
+    Append-only JSONL file of conversion records.
+
+    Each record is one short write to a file opened in append mode, so
+    batch workers in several processes can share one log.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+
+    def record(self, input_file, outputs, status, wall_s, usage=None, error=None):
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "input": os.path.abspath(input_file),
+            "outputs": [os.path.abspath(o) for o in outputs],
+            "status": status,
+            "wall_s": round(wall_s, 4),
+            "cpu_user_s": None,
+            "cpu_sys_s": None,
+            "max_rss_kb": None,
+            "input_bytes": file_size(input_file),
+            "output_bytes": sum(file_size(o) or 0 for o in outputs) if status != "failed" else None,
+        }
+        record.update(usage or {})
+        if error is not None:
+            record["error"] = error
+
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_records(log_path):
+    """Read a metrics log, skipping lines that are not valid JSON."""
+    records = []
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(records, top=10):
+    """Return the summary report of a list of records as text."""
+    built = [r for r in records if r["status"] == "built"]
+    lines = [
+        f"{len(records)} conversions: {len(built)} built, "
+        f"{sum(r['status'] == 'cached' for r in records)} cached, "
+        f"{sum(r['status'] == 'failed' for r in records)} failed"
+    ]
+    if not built:
+        return "\n".join(lines)
+
+    # Slowest documents by mean wall time of their real builds
+    per_doc = {}
+    for r in built:
+        per_doc.setdefault(r["input"], []).append(r)
+    total_wall = sum(r["wall_s"] for r in built)
+    ranking = sorted(
+        per_doc.items(),
+        key=lambda item: statistics.fmean(r["wall_s"] for r in item[1]),
+        reverse=True
+    )
+
+    lines.append(f"\nSlowest documents (mean of built runs, {total_wall:.1f}s total):")
+    lines.append(f"{'wall s':>8} {'cpu s':>8} {'rss MB':>8} {'in KB':>8} {'out KB':>8} {'share':>6}  document")
+    for doc, runs in ranking[:top]:
+        wall = statistics.fmean(r["wall_s"] for r in runs)
+        cpu = [r["cpu_user_s"] + r["cpu_sys_s"] for r in runs if r.get("cpu_user_s") is not None]
+        rss = [r["max_rss_kb"] for r in runs if r.get("max_rss_kb") is not None]
+        share = sum(r["wall_s"] for r in runs) / total_wall * 100 if total_wall else 0
+        lines.append(
+            f"{wall:8.2f} "
+            f"{(statistics.fmean(cpu) if cpu else float('nan')):8.2f} "
+            f"{(max(rss) / 1024 if rss else float('nan')):8.1f} "
+            f"{(runs[-1]['input_bytes'] or 0) / 1024:8.1f} "
+            f"{(runs[-1]['output_bytes'] or 0) / 1024:8.1f} "
+            f"{share:5.1f}%  {doc}"
+        )
+
+    walls = sorted(r["wall_s"] for r in built)
+    lines.append("\nBuild time distribution:")
+    lines.append(
+        "  " + "  ".join(
+            f"{name} {percentile(walls, q):.2f}s"
+            for name, q in (("min", 0), ("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1))
+        )
+    )
+
+    # Coarse histogram on doubling buckets
+    edges = [0.5, 1, 2, 4, 8, 16, 32, 64]
+    counts = [0] * (len(edges) + 1)
+    for wall in walls:
+        counts[sum(wall >= e for e in edges)] += 1
+    labels = [f"< {edges[0]}s"] + [f"{a}-{b}s" for a, b in zip(edges, edges[1:])] + [f">= {edges[-1]}s"]
+    width = max(counts)
+    for label, count in zip(labels, counts):
+        if count:
+            lines.append(f"  {label:>8} {'#' * max(1, round(count / width * 40))} {count}")
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarise a paper_convert --metrics-log file."
+    )
+    parser.add_argument("log_path", help="Path to the metrics JSONL log")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest documents to show")
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.log_path):
+        print(f"Error: Metrics log '{args.log_path}' not found.")
+        return
+    print(summarize(load_records(args.log_path), args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+##################################################################
+# CONVERSION PROFILES FOR paper_convert.py
+#
+# Named sets of Pandoc variables and options (paper, feedback, slides)
+# loaded from paper.yaml. Profiles are validated and resolved into an
+# argument vector once per process; batch runs reuse the result.
+##################################################################
+import os
+from functools import lru_cache
+
+import yaml
+
+DEFAULT_PROFILES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paper.yaml")
+DEFAULT_PROFILE = "paper"
+
+PROFILE_KEYS = {"description", "extends", "variables", "options"}
+
+# Pandoc options that pick the writer, e.g. the slides profile's --to=beamer.
+# Profile options go to every output format, so these only fit PDF-only runs
+WRITER_OPTIONS = ("--to", "--write", "-t", "-w")
+
+
+def _validate(name, profile):
+    """Raise ValueError if a profile entry is malformed."""
+    if not isinstance(profile, dict):
+        raise ValueError(f"Profile '{name}' must be a mapping.")
+
+    unknown = set(profile) - PROFILE_KEYS
+    if unknown:
+        raise ValueError(
+            f"Profile '{name}' has unknown keys: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(sorted(PROFILE_KEYS))}."
+        )
+
+    variables = profile.get("variables", {})
+    if not isinstance(variables, dict):
+        raise ValueError(f"Profile '{name}': 'variables' must be a mapping.")
+    for key, value in variables.items():
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"Profile '{name}': variable '{key}' must be a single value.")
+
+    options = profile.get("options", [])
+    if not isinstance(options, list) or not all(isinstance(o, str) for o in options):
+        raise ValueError(f"Profile '{name}': 'options' must be a list of strings.")
+
+
+@lru_cache(maxsize=None)
+def _load(path, mtime_ns):
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    profiles = data.get("profiles") if isinstance(data, dict) else None
+    if not isinstance(profiles, dict) or not profiles:
+        raise ValueError(f"'{path}' has no 'profiles' mapping.")
+
+    for name, profile in profiles.items():
+        _validate(name, profile)
+        parent = profile.get("extends")
+        if parent is not None and parent not in profiles:
+            raise ValueError(f"Profile '{name}' extends unknown profile '{parent}'.")
+    return profiles
+
+
+def load_profiles(path=DEFAULT_PROFILES_FILE):
+    """
+    Load and validate the profiles in `path`.
+
+    The parsed file is cached until its modification time changes.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Profiles file '{path}' not found.")
+    path = os.path.abspath(path)
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+def _merge(profiles, name, seen=()):
+    """Flatten `extends` chains into one (variables, options) pair."""
+    if name in seen:
+        raise ValueError(f"Profile '{name}' extends itself: {' -> '.join(seen + (name,))}.")
+    profile = profiles[name]
+
+    variables, options = {}, []
+    if profile.get("extends") is not None:
+        variables, options = _merge(profiles, profile["extends"], seen + (name,))
+
+    variables = {**variables, **profile.get("variables", {})}
+    options = options + profile.get("options", [])
+    return variables, options
+
+
+def _format_value(value):
+    if value is True:
+        return "true"
+    return str(value)
+
+
+@lru_cache(maxsize=None)
+def _resolve(path, mtime_ns, name, overrides):
+    profiles = _load(path, mtime_ns)
+    if name not in profiles:
+        raise ValueError(
+            f"Unknown profile '{name}'. Available: {', '.join(sorted(profiles))}."
+        )
+
+    variables, options = _merge(profiles, name)
+    variables.update(overrides)
+
+    argv = []
+    for key, value in variables.items():
+        # false unsets a variable inherited from a parent profile
+        if value is False or value is None:
+            continue
+        argv.extend(["--variable", f"{key}:{_format_value(value)}"])
+    argv.extend(options)
+    return tuple(argv)
+
+
+def resolve_profile(name=DEFAULT_PROFILE, overrides=(), path=DEFAULT_PROFILES_FILE):
+    """
+    Return the Pandoc arguments of a profile as a tuple.
+
+    Parameters:
+    - name (str): Profile name in the profiles file.
+    - overrides (iterable[(str, str)]): Variables that replace the profile's,
+      e.g. from `parse_overrides`.
+    - path (str): Profiles file, paper.yaml next to this script by default.
+
+    Resolved profiles are cached per (file version, name, overrides).
+    """
+    load_profiles(path)
+    path = os.path.abspath(path)
+    return _resolve(path, os.stat(path).st_mtime_ns, name, tuple(overrides))
+
+
+def writer_options(argv):
+    """Return the arguments in a resolved profile that select Pandoc's writer."""
+    found = []
+    for arg in argv:
+        for option in WRITER_OPTIONS:
+            long_form = option.startswith("--") and (arg == option or arg.startswith(option + "="))
+            short_form = not option.startswith("--") and arg.startswith(option) and not arg.startswith("--")
+            if long_form or short_form:
+                found.append(arg)
+                break
+    return found
+
+
+def parse_overrides(pairs):
+    """
+    Turn ['key=value', ...] (or 'key:value') into a tuple of (key, value).
+
+    'true' and 'false' become booleans, so `-V toc=false` unsets the variable
+    like `toc: false` in the YAML (Pandoc reads the string "false" as set).
+    """
+    overrides = []
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            key, sep, value = pair.partition(":")
+        if not sep or not key:
+            raise ValueError(f"Variable override '{pair}' must look like KEY=VALUE.")
+        value = value.strip()
+        value = {"true": True, "false": False}.get(value.lower(), value)
+        overrides.append((key.strip(), value))
+    return tuple(overrides)
+
+
+def describe_profiles(path=DEFAULT_PROFILES_FILE):
+    """Return (name, description) for every profile in the file."""
+    return [(name, p.get("description", "")) for name, p in load_profiles(path).items()]
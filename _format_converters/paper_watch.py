@@ -0,0 +1,176 @@
+##################################################################
+# WATCH-AND-REBUILD MODE FOR paper_convert.py
+#
+# Usage: python paper_convert.py <dir> --watch [--out-dir out] [--debounce 0.5]
+#
+# Rebuilds the PDF of a document when it, or anything it depends on
+# (images, bib, metadata YAML), changes. Bursts of editor saves are
+# debounced and each document has at most one build in flight.
+##################################################################
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from paper_convert import build_config, convert_batch, convert_to_pdf, collect_inputs, output_path
+from paper_profiles import resolve_profile
+
+WRITE_EVENTS = ("created", "modified", "moved", "deleted")
+
+
+class RebuildScheduler:
+    """
+    Debounced build queue with at most one build in flight per document.
+
+    A document becomes due `debounce` seconds after the last event that
+    touched it. Events arriving while it builds mark it dirty, and it is
+    rebuilt once the running build finishes.
+    """
+
+    def __init__(self, build, debounce=0.5, workers=None):
+        self.build = build
+        self.debounce = debounce
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.pending = {}  # document -> due time
+        self.in_flight = set()
+        self.dirty = set()
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, document):
+        with self.condition:
+            if document in self.in_flight:
+                self.dirty.add(document)
+            else:
+                self.pending[document] = time.monotonic() + self.debounce
+            self.condition.notify()
+
+    def _run(self):
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                due = [doc for doc, t in self.pending.items() if t <= now]
+                for doc in due:
+                    del self.pending[doc]
+                    self.in_flight.add(doc)
+                    self.pool.submit(self._build, doc)
+                timeout = min(self.pending.values(), default=now + 3600) - now
+                self.condition.wait(timeout=max(timeout, 0))
+
+    def _build(self, document):
+        try:
+            self.build(document)
+        finally:
+            with self.condition:
+                self.in_flight.discard(document)
+                if document in self.dirty:
+                    self.dirty.discard(document)
+                    self.pending[document] = time.monotonic() + self.debounce
+                    self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        self.pool.shutdown(wait=True)
+
+
+class SourceChangeHandler(FileSystemEventHandler):
+    def __init__(self, directory, graph, graph_lock, scheduler):
+        self.directory = os.path.abspath(directory)
+        self.graph = graph
+        self.graph_lock = graph_lock
+        self.scheduler = scheduler
+
+    def on_any_event(self, event):
+        # Builds open and read the sources too; only react to actual writes
+        if event.is_directory or event.event_type not in WRITE_EVENTS:
+            return
+
+        # Editors often save through a temp file renamed over the original
+        path = os.path.abspath(getattr(event, "dest_path", "") or event.src_path)
+
+        with self.graph_lock:
+            documents = set(self.graph.dependents(path))
+        if path.endswith(".md") and os.path.dirname(path) == self.directory and os.path.isfile(path):
+            documents.add(path)
+
+        for document in documents:
+            if os.path.isfile(document):
+                self.scheduler.schedule(document)
+
+
+def watch(directory, output_dir=None, bib=None, logo=None, image_dir=None,
+          cache=None, graph=None, debounce=0.5, workers=None, lint="warn",
+          profile_options=None, metrics=None, header_dir=None):
+    """
+    Bring `directory` up to date, then rebuild documents as their inputs change.
+
+    Parameters:
+    - directory (str): Folder with the Markdown sources.
+    - output_dir, bib, logo, image_dir, cache, lint, profile_options, metrics,
+      header_dir: See `convert_batch`.
+    - graph (DependencyGraph): Maps changed files to the documents built from them.
+    - debounce (float, optional): Quiet period in seconds before a rebuild.
+    - workers (int, optional): Maximum number of builds running at once.
+    """
+    if profile_options is None:
+        profile_options = resolve_profile()
+    config = build_config(bib, logo, image_dir, profile_options=profile_options, lint=lint)
+    graph_lock = threading.Lock()
+
+    # Initial incremental build, which also fills the dependency graph
+    convert_batch(collect_inputs(directory), output_dir, bib, logo, image_dir,
+                  workers, cache, graph, lint, profile_options=profile_options,
+                  metrics=metrics, header_dir=header_dir)
+
+    def build(document):
+        target = output_path(document, output_dir)
+        with graph_lock:
+            stamps = graph.snapshot(document, (bib, logo), image_dir)
+        start = time.perf_counter()
+        try:
+            convert_to_pdf(document, target, bib, logo, image_dir,
+                           interactive=False, cache=cache, lint=lint,
+                           profile_options=profile_options, metrics=metrics,
+                           header_dir=header_dir)
+        except Exception as e:
+            print(f"[FAIL] {document}: {e}")
+            return
+        with graph_lock:
+            graph.record(document, target, stamps, config)
+            graph.save()
+        print(f"[OK  ] {document} ({time.perf_counter() - start:.1f}s) -> {target}")
+
+    scheduler = RebuildScheduler(build, debounce, workers)
+    event_handler = SourceChangeHandler(directory, graph, graph_lock, scheduler)
+    observer = Observer()
+    observer.schedule(event_handler, path=directory, recursive=True)
+
+    # Dependencies outside the watched folder (shared figures, bib) need their own watches
+    watched = {os.path.abspath(directory)}
+    for entry in list(graph.docs.values()):
+        for dep in entry["stamps"]:
+            parent = os.path.dirname(dep)
+            if os.path.isdir(parent) and not any(
+                parent == w or parent.startswith(w + os.sep) for w in watched
+            ):
+                observer.schedule(event_handler, path=parent, recursive=False)
+                watched.add(parent)
+
+    observer.start()
+    print(f"Watching {directory} for changes. Press Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        observer.stop()
+    observer.join()
+    scheduler.stop()
@@ -1,27 +1,351 @@
+import os
 import re
+import json
+import shutil
+import hashlib
+import tempfile
+import time
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def apply_changes(log_path, dir_path):
-    with open(log_path, 'r') as log_file:
-        changes = log_file.read().split('\n\n')
+def load_change_logger():
+    # change_logger@0.0.py owns the journal format; the '@' in its name rules
+    # out a plain import, so load it from its path next to this script
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'change_logger@0.0.py')
+    spec = importlib.util.spec_from_file_location('change_logger', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-    for change in changes:
-        if not change:
+change_logger = load_change_logger()
+detect_encoding = change_logger.detect_encoding
+split_lines = change_logger.split_lines
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+DEFAULT_FUZZ = 2
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+def read_journal(log_path, since=None, until=None, files=None):
+    # Journal entries as (header, payload), oldest first per file. The time
+    # window and file filter go through the journal's index, so only the
+    # matching entries are read and decoded. Read-only: a torn last entry is
+    # skipped, not truncated, so --dry-run and --report leave the journal as is
+    journal = change_logger.ChangeJournal(log_path)
+    if files is None:
+        return list(journal.entries(None, since, until))
+    return [entry for file in sorted(files) for entry in journal.entries(file, since, until)]
+
+def parse_hunks(payload):
+    # [(old_start, old_len, [(op, text), ...])] of a unified diff
+    hunks = []
+    for line in split_lines(payload):
+        if line.startswith('@@'):
+            m = HUNK_HEADER.match(line)
+            hunks.append((int(m[1]), int(m[2] or 1), []))
+        elif not hunks:
+            continue  # file header
+        elif line.startswith('\\'):
+            # '\ No newline at end of file' applies to the line before it
+            op, text = hunks[-1][2][-1]
+            hunks[-1][2][-1] = (op, text.rstrip('\n'))
+        elif line[:1] in (' ', '-', '+'):
+            hunks[-1][2].append((line[0], line[1:]))
+    return hunks
+
+def locate(lines, old, expected, start):
+    # Position of `old` in lines[start:] nearest to `expected`, or None
+    last = len(lines) - len(old)
+    if last < start:
+        return None
+    expected = min(max(expected, start), last)
+    for distance in range(max(expected - start, last - expected) + 1):
+        for pos in (expected - distance, expected + distance):
+            if start <= pos <= last and (not old or lines[pos] == old[0]) and lines[pos:pos + len(old)] == old:
+                return pos
+            if distance == 0:
+                break
+    return None
+
+def apply_hunks(lines, hunks, fuzz=DEFAULT_FUZZ):
+    # Apply hunks in one pass over `lines` the way patch(1) does: each hunk
+    # is looked for at its line number shifted by the previous hunk's offset,
+    # then ever further away; failing that, with up to `fuzz` context lines
+    # dropped from either end. Returns (new lines, per-hunk reports)
+    result, reports = [], []
+    pos = offset = 0
+    for number, (old_start, old_len, body) in enumerate(hunks, 1):
+        base = old_start if old_len == 0 else old_start - 1
+        found = None
+        for f in range(fuzz + 1):
+            top = 0
+            while top < f and top < len(body) and body[top][0] == ' ':
+                top += 1
+            bottom = 0
+            while bottom < f and bottom < len(body) - top and body[-1 - bottom][0] == ' ':
+                bottom += 1
+            trimmed = body[top:len(body) - bottom]
+            old = [text for op, text in trimmed if op != '+']
+            found = locate(lines, old, base + top + offset, pos)
+            if found is not None:
+                break
+
+        if found is None:
+            reports.append({'hunk': number, 'status': 'conflict', 'line': old_start})
+            continue
+
+        shift = found - (base + top)
+        status = 'fuzz' if f else ('offset' if shift else 'clean')
+        reports.append({'hunk': number, 'status': status, 'line': old_start, 'offset': shift, 'fuzz': f})
+        result.extend(lines[pos:found])
+        result.extend(text for op, text in trimmed if op != '-')
+        pos = found + len(old)
+        offset = shift
+    result.extend(lines[pos:])
+    return result, reports
+
+def content_hash(lines, encoding):
+    return hashlib.sha256(''.join(lines).encode(encoding)).hexdigest()
+
+def chain_start(entries, current_hash):
+    # Index of the first entry to apply to a file whose content hashes to
+    # current_hash, and whether that base is verified; len(entries) when the
+    # file is already at the last version
+    if current_hash == entries[-1][0]['new_hash']:
+        return len(entries), True
+    for i in range(len(entries) - 1, -1, -1):
+        if entries[i][0]['base_hash'] == current_hash:
+            return i, True
+        if entries[i][0]['new_hash'] == current_hash:
+            return i + 1, True
+    return 0, False
+
+def target_path(dir_path, file):
+    parts = file.split('/')
+    if os.path.isabs(file) or '..' in parts:
+        raise ValueError(f"Refusing to write outside {dir_path}: {file}")
+    return os.path.join(dir_path, *parts)
+
+def plan_file(dir_path, file, entries, fuzz=DEFAULT_FUZZ):
+    # Read a file once and apply its journal entries in memory. Returns
+    # (report, new lines or None to delete, encoding); nothing is written
+    filepath = target_path(dir_path, file)
+    report = {'file': file, 'entries': 0, 'hunks': [], 'base_verified': False}
+
+    if os.path.isfile(filepath):
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        encoding = detect_encoding(data[:change_logger.ENCODING_SAMPLE])
+        try:
+            lines = split_lines(data.decode(encoding))
+        except UnicodeDecodeError:
+            encoding = 'latin-1'
+            lines = split_lines(data.decode(encoding))
+        current_hash = hashlib.sha256(data).hexdigest()
+    else:
+        encoding, lines, current_hash = 'utf-8', None, None
+
+    start, verified = chain_start(entries, current_hash)
+    report['base_verified'] = verified
+    if start == len(entries):
+        report['status'] = 'up-to-date'
+        return report, lines, encoding
+
+    for number, (header, payload) in enumerate(entries[start:], start + 1):
+        report['entries'] += 1
+        if header['kind'] == 'deleted':
+            lines = None
             continue
-        
-        file_info, *changes = change.split('\n')
-        filename = re.match(r"Changes for (.+):", file_info).group(1)
-        filepath = os.path.join(dir_path, filename)
+        reason = None
+        if header.get('note'):
+            # No diff was recorded for this step; nothing after it can be trusted
+            reason = header['note']
+        elif header['kind'] == 'added' and lines:
+            reason = 'file already exists with other content'
+        elif header['kind'] != 'added' and lines is None:
+            reason = 'file is missing'
+        if reason is not None:
+            report['hunks'].append({'entry': number, 'status': 'conflict', 'reason': reason})
+            break
+
+        lines = lines or []
+        lines, hunk_reports = apply_hunks(lines, parse_hunks(payload), fuzz)
+        report['hunks'] += [{'entry': number, **r} for r in hunk_reports]
+
+    statuses = {h['status'] for h in report['hunks']}
+    if 'conflict' in statuses:
+        report['status'] = 'conflict'
+    elif statuses - {'clean'} or not verified:
+        report['status'] = 'applied-inexact'
+    else:
+        report['status'] = 'applied'
+
+    # A verified chain applied cleanly must reproduce the logged version
+    final_hash = content_hash(lines, encoding) if lines is not None else None
+    if report['status'] == 'applied' and final_hash != entries[-1][0]['new_hash']:
+        report['status'] = 'applied-inexact'
+        report['hash_mismatch'] = True
+    return report, lines, encoding
+
+def write_file(filepath, lines, encoding):
+    # Atomic replace: write a temporary file next to the target, then rename
+    if lines is None:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return
+
+    directory = os.path.dirname(filepath) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.apply-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(''.join(lines).encode(encoding))
+        if os.path.exists(filepath):
+            shutil.copymode(filepath, tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def apply_file(dir_path, file, entries, fuzz=DEFAULT_FUZZ, partial=False, dry_run=False):
+    # One read-modify-write per file; files with conflicts are left alone
+    # unless `partial`. With `dry_run` nothing is written, the report says
+    # whether the file would be
+    try:
+        report, lines, encoding = plan_file(dir_path, file, entries, fuzz)
+    except (OSError, ValueError) as e:
+        return {'file': file, 'status': 'error', 'error': str(e), 'hunks': [], 'written': False}
+
+    write = report['status'] != 'up-to-date' and (report['status'] != 'conflict' or partial)
+    if dry_run:
+        report['would_write'] = write
+        write = False
+    if write:
+        write_file(target_path(dir_path, file), lines, encoding)
+    report['written'] = write
+    return report
+
+def group_entries(entries, files=None):
+    by_file = {}
+    for header, payload in entries:
+        if files is None or header['file'] in files:
+            by_file.setdefault(header['file'], []).append((header, payload))
+    return by_file
+
+def _apply_job(job):
+    return apply_file(*job)
+
+def apply_changes(log_path, dir_path, since=None, until=None, files=None,
+                  fuzz=DEFAULT_FUZZ, partial=False, workers=DEFAULT_WORKERS, dry_run=False):
+    # Apply the journal to dir_path (or only plan it, with dry_run), files in
+    # parallel worker processes; returns the per-file reports sorted by file
+    by_file = group_entries(read_journal(log_path, since, until, files))
+    jobs = [
+        (dir_path, file, entries, fuzz, partial, dry_run)
+        for file, entries in sorted(by_file.items())
+    ]
+    if workers > 1 and len(jobs) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+    with executor:
+        return list(executor.map(_apply_job, jobs, chunksize=max(1, len(jobs) // (8 * max(1, workers)))))
+
+def build_report(reports, log_path, dir_path, dry_run):
+    # Machine-readable summary: file and hunk counts per status, then the
+    # per-file reports with every hunk's status, offset and fuzz
+    files, hunks = {}, {}
+    for report in reports:
+        files[report['status']] = files.get(report['status'], 0) + 1
+        for hunk in report['hunks']:
+            hunks[hunk['status']] = hunks.get(hunk['status'], 0) + 1
+    return {
+        'journal': os.path.abspath(log_path),
+        'directory': os.path.abspath(dir_path),
+        'dry_run': dry_run,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'summary': {'files': files, 'hunks': hunks},
+        'files': reports,
+    }
+
+def describe(report):
+    counts = {}
+    for hunk in report['hunks']:
+        counts[hunk['status']] = counts.get(hunk['status'], 0) + 1
+    detail = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+    if report.get('error'):
+        detail = report['error']
+    return f"{report['file']} ({detail or 'no hunks'})"
+
+def main():
+    import argparse
+    from datetime import datetime
+    parser = argparse.ArgumentParser(
+        description="Re-apply a change_logger journal to a directory (e.g. a re-downloaded corpus)."
+    )
+    parser.add_argument('log_path', type=str, help="Change journal written by change_logger")
+    parser.add_argument('dir_path', type=str, help="Directory to apply the changes to")
+    parser.add_argument('--file', action='append', default=None,
+                        help="Only apply changes to this file (relative path, repeatable)")
+    parser.add_argument('--since', type=str, default=None,
+                        help="Only entries from this time on (YYYY-MM-DD[THH:MM[:SS]])")
+    parser.add_argument('--until', type=str, default=None,
+                        help="Only entries before this time")
+    parser.add_argument('--fuzz', type=int, default=DEFAULT_FUZZ,
+                        help="Context lines a hunk may ignore at each end to apply")
+    parser.add_argument('--partial', action='store_true',
+                        help="Write files even if some of their hunks conflict")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Files processed in parallel (default: CPU cores)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Only report which hunks apply cleanly, with offset/fuzz, or conflict")
+    parser.add_argument('--report', type=str, default=None,
+                        help="Write a JSON report of every file and hunk here ('-' for stdout)")
+
+    args = parser.parse_args()
+    since, until = (
+        datetime.fromisoformat(value).timestamp() if value else None
+        for value in (args.since, args.until)
+    )
+
+    if not os.path.isfile(args.log_path):
+        parser.error(f"Journal {args.log_path} not found")
+    try:
+        # Validates without repairing; only change_logger's appends write it
+        change_logger.ChangeJournal(args.log_path).records()
+    except ValueError as e:
+        parser.error(str(e))
+
+    reports = apply_changes(args.log_path, args.dir_path, since, until,
+                            set(args.file) if args.file else None,
+                            args.fuzz, args.partial, args.workers, args.dry_run)
+    failed = sum(r['status'] in ('conflict', 'error') for r in reports)
 
-        with open(filepath, 'r') as file:
-            content = file.read()
+    if args.report is not None:
+        report = json.dumps(build_report(reports, args.log_path, args.dir_path, args.dry_run), indent=2)
+        if args.report == '-':
+            print(report)
+            raise SystemExit(1 if failed else 0)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
 
-        for change in changes:
-            if change:
-                # Apply the change to the content
-                content = re.sub(r'(pattern_to_replace)', r'replacement', content)
+    labels = {
+        'applied': 'OK  ', 'applied-inexact': 'FUZZ', 'up-to-date': 'SKIP',
+        'conflict': 'FAIL', 'error': 'FAIL',
+    }
+    for report in reports:
+        note = ''
+        if report['status'] == 'conflict' and not args.dry_run and not report['written']:
+            note = ' (not written)'
+        print(f"[{labels[report['status']]}] {describe(report)}{note}")
 
-        with open(filepath, 'w') as file:
-            file.write(content)
+    verb = 'would apply' if args.dry_run else 'applied'
+    print(f"\n{len(reports)} files: {len(reports) - failed} {verb} or up to date, {failed} with conflicts")
+    if args.dry_run:
+        print("Dry run: nothing was written.")
+    if args.report not in (None, '-'):
+        print(f"Report written to {args.report}")
+    if failed:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    apply_changes('path/to/log.txt', 'path/to/redownloaded/files')
+    main()
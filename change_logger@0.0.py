@@ -1,77 +1,759 @@
 import os
-import pickle
+import re
+import json
+import mmap
+import zlib
+import codecs
+import struct
+import bisect
+import shutil
+import hashlib
 import difflib
+import tempfile
+import itertools
+import time
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def log_changes(dir_path, log_path, snapshot):
-    # Implement change logging
-    new_snapshot = {f: os.path.join(dir_path, f) for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f))}
-    changes = {}
+# Snapshot index format: {"version": 1, "files": {relpath: {"size", "mtime_ns", "hash"}}}
+# File contents live once per distinct hash in <snapshot_path>.objects/
+SNAPSHOT_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Versions at least this large are diffed from memory maps, see large_file_hunks
+LARGE_FILE_BYTES = 16 * 1024 * 1024
+ENCODING_SAMPLE = 64 * 1024
+CONTEXT = 3
+CDC_MASK = 0x3f               # content-defined chunks of ~64 lines
+CDC_MAX_BYTES = 256 * 1024
+# Change journal: JOURNAL_MAGIC, then per entry ENTRY (magic, header and
+# payload lengths), a JSON header and the UTF-8 diff text as payload. The
+# sidecar <journal>.idx holds one INDEX_RECORD per entry, in journal order
+JOURNAL_MAGIC = b'CLJ1\n'
+ENTRY_MAGIC = b'CLE1'
+ENTRY = struct.Struct('<4sIQ')
+INDEX_RECORD = struct.Struct('<dQQ8s')      # timestamp, offset, length, file key
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)((?:,\d+)?) \+(\d+)((?:,\d+)?) @@$')
+
+# Never read or diffed unless re-included with a '!pattern'
+DEFAULT_EXCLUDES = [
+    '.git/', '__pycache__/', '*.pyc', '.ipynb_checkpoints/',
+    '*.zip', '*.gz', '*.7z', '*.tar', '*.pdf', '*.png', '*.jpg', '*.jpeg', '*.gif',
+    '*.xlsx', '*.xls', '*.docx', '*.parquet', '*.feather', '*.dta', '*.rds', '*.RData',
+    '*.pkl', '*.pickle', '*.npy', '*.npz', '*.h5', '*.exe', '*.dll', '*.so',
+]
+
+def store_dir_for(snapshot_path):
+    return snapshot_path + '.objects'
+
+def blob_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], digest)
+
+def store_file(store_dir, filepath):
+    # Hash and copy the file in one read; identical contents are stored once
+    os.makedirs(store_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=store_dir)
+    with open(filepath, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            dst.write(chunk)
+
+    digest = digest.hexdigest()
+    dest = blob_path(store_dir, digest)
+    if os.path.exists(dest):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp_path, dest)
+    return digest
+
+def detect_encoding(sample):
+    # Encoding of a file from a prefix sample: BOM, else UTF-8 if the sample
+    # decodes (a character cut off at the end of the sample is fine), else latin-1
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if not (e.reason == 'unexpected end of data' and e.start >= len(sample) - 3):
+            return 'latin-1'
+    return 'utf-8'
+
+def decode(data, encoding):
+    # Decode from memory; bytes that contradict the sampled encoding fall back
+    # to latin-1 without re-reading the file
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
 
-    for file, filepath in new_snapshot.items():
-        if file not in snapshot:
-            changes[file] = 'New file added'
+def split_lines(text):
+    # Lines split on '\n' only, endings kept (same lines as the large-file path)
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+def prune_store(store_dir, index):
+    # Remove the stored versions `index` no longer references, and temp files
+    # an interrupted run left behind; only the referenced versions are needed
+    # to diff the next run. Returns the number of bytes freed
+    if not os.path.isdir(store_dir):
+        return 0
+    keep = {entry['hash'] for entry in index.values()}
+    freed = 0
+    with os.scandir(store_dir) as shards:
+        for shard in shards:
+            if shard.is_file(follow_symlinks=False) and shard.name.endswith('.tmp'):
+                freed += shard.stat().st_size
+                os.remove(shard.path)
+            elif shard.is_dir(follow_symlinks=False) and len(shard.name) == 2:
+                with os.scandir(shard.path) as blobs:
+                    for blob in blobs:
+                        if blob.name not in keep:
+                            freed += blob.stat().st_size
+                            os.remove(blob.path)
+                if not os.listdir(shard.path):
+                    os.rmdir(shard.path)
+    return freed
+
+def read_blob_lines(store_dir, digest, encoding=None):
+    with open(blob_path(store_dir, digest), 'rb') as f:
+        data = f.read()
+    encoding = encoding or detect_encoding(data[:ENCODING_SAMPLE])
+    return split_lines(decode(data, encoding))
+
+def sample_encoding(filepath):
+    with open(filepath, 'rb') as f:
+        return detect_encoding(f.read(ENCODING_SAMPLE))
+
+def ordered_map(executor, fn, items, window):
+    # Like executor.map, but with at most `window` tasks in flight, so memory
+    # stays bounded however many items there are; results keep input order
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def compile_pattern(pattern):
+    # Translate one .gitignore pattern into (regex, negate, dir_only). Patterns
+    # with a slash are anchored to the scanned directory, others match at any depth
+    negate = pattern.startswith('!')
+    if negate:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex, i = '', 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex, i = regex + '(?:.*/)?', i + 3
+        elif pattern.startswith('**', i):
+            regex, i = regex + '.*', i + 2
+        elif pattern[i] == '*':
+            regex, i = regex + '[^/]*', i + 1
+        elif pattern[i] == '?':
+            regex, i = regex + '[^/]', i + 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            regex, i = regex + '[' + body.replace('\\', '\\\\') + ']', end + 1
         else:
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    new_content = f.readlines()
-            except UnicodeDecodeError:
-                with open(filepath, 'r', encoding='latin-1') as f:
-                    new_content = f.readlines()
-
-            try:
-                with open(snapshot[file], 'r', encoding='utf-8') as f:
-                    old_content = f.readlines()
-            except UnicodeDecodeError:
-                with open(snapshot[file], 'r', encoding='latin-1') as f:
-                    old_content = f.readlines()
-
-            diffs = list(difflib.unified_diff(old_content, new_content, lineterm=''))
-            if diffs:
-                changes[file] = diffs
-
-    with open(log_path, 'w', encoding='utf-8') as log_file:
-        for file, changes in changes.items():
-            log_file.write(f"Changes for {file}:\n")
-            log_file.writelines(changes)
-            log_file.write("\n")
+            regex, i = regex + re.escape(pattern[i]), i + 1
+
+    return re.compile(('' if anchored else '(?:.*/)?') + regex + '$'), negate, dir_only
+
+def read_ignore_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip('\n').rstrip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+class PathFilter:
+    # Precompiled include/exclude rules over POSIX relative paths. Excludes
+    # follow .gitignore semantics (last match wins, '!' re-includes); with
+    # include patterns, only files matching one of them are kept
+    def __init__(self, excludes=(), includes=()):
+        self.rules = [compile_pattern(p) for p in excludes]
+        self.includes = [compile_pattern(p)[0] for p in includes]
+
+    def excluded(self, relpath, is_dir):
+        result = False
+        for regex, negate, dir_only in self.rules:
+            if (is_dir or not dir_only) and regex.match(relpath):
+                result = not negate
+        return result
+
+    def accepts(self, relpath):
+        if self.excluded(relpath, False):
+            return False
+        return not self.includes or any(regex.match(relpath) for regex in self.includes)
+
+def make_filter(dir_path, includes=(), excludes=(), ignore_file=None, use_defaults=True):
+    # Rules in order: defaults, the ignore file (dir_path/.gitignore if it
+    # exists and none is given), then command line excludes
+    if ignore_file is None and os.path.isfile(os.path.join(dir_path, '.gitignore')):
+        ignore_file = os.path.join(dir_path, '.gitignore')
+    rules = list(DEFAULT_EXCLUDES) if use_defaults else []
+    if ignore_file is not None:
+        rules += read_ignore_file(ignore_file)
+    return PathFilter(rules + list(excludes), includes)
+
+def scan_files(dir_path, path_filter=None, skip=()):
+    # Recursive os.scandir walk; returns sorted (relpath, stat) pairs. Excluded
+    # directories are never entered, and each file's stat comes from its DirEntry
+    path_filter = path_filter or PathFilter()
+    skip = {os.path.abspath(p) for p in skip}
+    files, stack = [], ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            it = os.scandir(os.path.join(dir_path, rel_dir))
+        except (FileNotFoundError, PermissionError):
+            continue
+        with it:
+            for entry in it:
+                relpath = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                if skip and os.path.abspath(entry.path) in skip:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not path_filter.excluded(relpath, True):
+                            stack.append(relpath)
+                    elif entry.is_file() and path_filter.accepts(relpath):
+                        files.append((relpath, entry.stat()))
+                except FileNotFoundError:
+                    continue
+    files.sort()
+    return files
+
+def index_file(store_dir, filepath, st, prev):
+    # Index entry of one file; unchanged size and mtime reuse `prev` unread
+    if prev is not None and prev['size'] == st.st_size and prev['mtime_ns'] == st.st_mtime_ns:
+        return prev
+    try:
+        digest = store_file(store_dir, filepath)
+    except FileNotFoundError:
+        # Removed while scanning
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest}
+
+def build_index(dir_path, prev_index, store_dir, workers=DEFAULT_WORKERS, path_filter=None, skip=()):
+    # Files whose size and mtime match the previous index are not read at all.
+    # Hashing runs on threads (hashlib and file I/O release the GIL)
+    files = scan_files(dir_path, path_filter, (store_dir, *skip))
+    jobs = (
+        (store_dir, os.path.join(dir_path, relpath), st, prev_index.get(relpath))
+        for relpath, st in files
+    )
+
+    index = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        entries = ordered_map(pool, index_file, jobs, 4 * max(1, workers))
+        for (relpath, _), entry in zip(files, entries):
+            if entry is not None:
+                index[relpath] = entry
+    return index
+
+def load_snapshot(snapshot_path):
+    # ValueError if the file is not an index of this version, e.g. a pickled
+    # snapshot written by the previous change_logger
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION or not isinstance(data.get('files'), dict):
+        raise ValueError(
+            f"{snapshot_path} is not a snapshot index of this version (old pickle format?); "
+            f"delete it and run again to re-initialise the snapshot"
+        )
+    return data['files']
+
+def save_snapshot(snapshot_path, index):
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'files': index}, f, separators=(',', ':'))
+    os.replace(tmp_path, snapshot_path)
+
+def file_header(file, old_hash, new_hash):
+    # Diff header; the base and new hashes go in the date fields so a patch
+    # can be checked against the file it edits
+    fromfile = f'a/{file}\t{old_hash}' if old_hash is not None else '/dev/null'
+    return [f'--- {fromfile}\n', f'+++ b/{file}\t{new_hash}\n']
+
+def hunk_lines(old_lines, new_lines, old_offset=0, new_offset=0):
+    # Unified diff hunks of two line lists that start at the given (0-based)
+    # line offsets in their files; complete lines, missing final newlines marked
+    diff = difflib.unified_diff(old_lines, new_lines, n=CONTEXT, lineterm='\n')
+    for line in itertools.islice(diff, 2, None):
+        if line.startswith('@@') and (old_offset or new_offset):
+            m = HUNK_HEADER.match(line.rstrip('\n'))
+            line = f"@@ -{int(m[1]) + old_offset}{m[2]} +{int(m[3]) + new_offset}{m[4]} @@\n"
+        elif not line.endswith('\n'):
+            line += '\n\\ No newline at end of file\n'
+        yield line
+
+def diff_lines(file, old_lines, new_lines, old_hash=None, new_hash=None):
+    hunks = list(hunk_lines(old_lines, new_lines))
+    return file_header(file, old_hash, new_hash) + hunks if hunks else []
+
+def map_file(f):
+    size = os.fstat(f.fileno()).st_size
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+def common_prefix(a, b):
+    # Length of the identical leading bytes, compared a block at a time
+    n, i = min(len(a), len(b)), 0
+    for size in (CHUNK_SIZE, 4096, 1):
+        while i + size <= n and a[i:i + size] == b[i:i + size]:
+            i += size
+    return i
+
+def common_suffix(a, b, limit):
+    la, lb, i = len(a), len(b), 0
+    for size in (CHUNK_SIZE, 4096, 1):
+        while i + size <= limit and a[la - i - size:la - i] == b[lb - i - size:lb - i]:
+            i += size
+    return i
+
+def count_lines(mm, start, end):
+    return sum(mm[i:min(i + CHUNK_SIZE, end)].count(b'\n') for i in range(start, end, CHUNK_SIZE))
+
+def chunk_region(mm, start, end):
+    # Split mm[start:end] into line-aligned, content-defined chunks: a chunk
+    # ends after a line whose crc32 has its low bits clear, so boundaries
+    # resynchronise after insertions. Returns [(digest, start, end, lines)]
+    chunks = []
+    chunk_start, pos, lines = start, start, 0
+    while pos < end:
+        nl = mm.find(b'\n', pos, end)
+        line_end = end if nl < 0 else nl + 1
+        lines += 1
+        if (zlib.crc32(mm[pos:line_end]) & CDC_MASK) == 0 or line_end - chunk_start >= CDC_MAX_BYTES or line_end == end:
+            digest = hashlib.blake2b(mm[chunk_start:line_end], digest_size=16).digest()
+            chunks.append((digest, chunk_start, line_end, lines))
+            chunk_start, lines = line_end, 0
+        pos = line_end
+    return chunks
+
+def skip_lines(mm, pos, n, backwards):
+    # Move pos (a line start) n lines back or forward; returns (pos, lines moved)
+    moved = 0
+    while moved < n:
+        if backwards:
+            if pos == 0:
+                break
+            pos = mm.rfind(b'\n', 0, pos - 1) + 1
+        else:
+            if pos >= len(mm):
+                break
+            nl = mm.find(b'\n', pos)
+            pos = len(mm) if nl < 0 else nl + 1
+        moved += 1
+    return pos, moved
+
+def diff_windows(a, b):
+    # Byte windows [a0, a1) / [b0, b1) around every differing region, with
+    # their first line numbers and CONTEXT lines on either side; windows that
+    # would share context are merged
+    prefix = common_prefix(a, b)
+    prefix = a.rfind(b'\n', 0, prefix) + 1
+    suffix = common_suffix(a, b, min(len(a), len(b)) - prefix)
+    nl = a.find(b'\n', len(a) - suffix)
+    suffix = len(a) - (nl + 1) if suffix and nl >= 0 else 0
+
+    a_chunks = chunk_region(a, prefix, len(a) - suffix)
+    b_chunks = chunk_region(b, prefix, len(b) - suffix)
+    a_lines = list(itertools.accumulate((c[3] for c in a_chunks), initial=count_lines(a, 0, prefix)))
+    b_lines = list(itertools.accumulate((c[3] for c in b_chunks), initial=a_lines[0]))
+
+    matcher = difflib.SequenceMatcher(None, [c[0] for c in a_chunks], [c[0] for c in b_chunks], autojunk=False)
+    windows = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        a0 = a_chunks[i1][1] if i1 < len(a_chunks) else len(a) - suffix
+        a1 = a_chunks[i2 - 1][2] if i2 > i1 else a0
+        b0 = b_chunks[j1][1] if j1 < len(b_chunks) else len(b) - suffix
+        b1 = b_chunks[j2 - 1][2] if j2 > j1 else b0
+
+        # Context lies in identical regions, so it has the same length on both sides
+        start, back = skip_lines(a, a0, CONTEXT, True)
+        end, ahead = skip_lines(a, a1, CONTEXT, False)
+        window = [start, end, a_lines[i1] - back, b0 - (a0 - start), b1 + (end - a1), b_lines[j1] - back]
+        if windows and window[0] <= windows[-1][1]:
+            windows[-1][1], windows[-1][4] = window[1], window[4]
+        else:
+            windows.append(window)
+    return windows
+
+def large_file_hunks(old_path, new_path, encoding):
+    # Diff two large versions without loading either: memory-map both, skip
+    # the identical head and tail, match content-defined chunks by hash and
+    # run the line diff only on the windows around chunks that differ
+    with open(old_path, 'rb') as fa, open(new_path, 'rb') as fb:
+        a, b = map_file(fa), map_file(fb)
+        try:
+            for a0, a1, a_line, b0, b1, b_line in diff_windows(a, b):
+                old_lines = split_lines(decode(a[a0:a1], encoding))
+                new_lines = split_lines(decode(b[b0:b1], encoding))
+                yield from hunk_lines(old_lines, new_lines, a_line, b_line)
+        finally:
+            for mm in (a, b):
+                if isinstance(mm, mmap.mmap):
+                    mm.close()
+
+def diff_entry(store_dir, file, old_entry, new_entry, large_file_bytes=LARGE_FILE_BYTES):
+    # Diff lines between two stored versions of a file; old_entry None means
+    # a new file (an empty one has no lines). The encoding is detected once, from a prefix of the new version
+    new_blob = blob_path(store_dir, new_entry['hash'])
+    encoding = sample_encoding(new_blob)
+
+    if old_entry is None:
+        return diff_lines(file, [], read_blob_lines(store_dir, new_entry['hash'], encoding),
+                          None, new_entry['hash'])
+
+    # None: the previous version is not in the store, there is nothing to diff
+    old_blob = blob_path(store_dir, old_entry['hash'])
+    if not os.path.isfile(old_blob):
+        return None
+
+    # Byte-level line splitting needs an ASCII-compatible encoding
+    large = max(old_entry['size'], new_entry['size']) >= large_file_bytes
+    if large and encoding in ('utf-8', 'utf-8-sig', 'latin-1'):
+        hunks = list(large_file_hunks(old_blob, new_blob, encoding))
+        return file_header(file, old_entry['hash'], new_entry['hash']) + hunks if hunks else []
+
+    return diff_lines(
+        file,
+        read_blob_lines(store_dir, old_entry['hash'], encoding),
+        read_blob_lines(store_dir, new_entry['hash'], encoding),
+        old_entry['hash'], new_entry['hash']
+    )
+
+def file_key(file):
+    return hashlib.blake2b(file.encode('utf-8'), digest_size=8).digest()
+
+def entry_payload(lines):
+    # Encode diff lines; returns (payload, hunks) where each hunk is
+    # [byte offset of its @@ line, old start, old length, new start, new length]
+    payload, hunks, offset = [], [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        if line.startswith('@@'):
+            m = HUNK_HEADER.match(line.rstrip('\n'))
+            hunks.append([
+                offset,
+                int(m[1]), int(m[2][1:] or 1),
+                int(m[3]), int(m[4][1:] or 1),
+            ])
+        payload.append(data)
+        offset += len(data)
+    return b''.join(payload), hunks
+
+class ChangeJournal:
+    # Append-only journal of change entries with a fixed-size record index.
+    # Entries are never rewritten; lookups by time window bisect the index
+    # (timestamps never decrease) and lookups by file scan its 32-byte
+    # records, reading only the matching entries from the journal
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.idx'
+
+    def _read_index(self):
+        if not os.path.isfile(self.index_path):
+            return []
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        return list(INDEX_RECORD.iter_unpack(data[:usable]))
+
+    def _scan(self, f, offset):
+        # Index records of the complete entries from `offset` on, read from
+        # the entry headers only; returns (records, end of the last one)
+        records = []
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        while offset + ENTRY.size <= size:
+            f.seek(offset)
+            magic, header_len, payload_len = ENTRY.unpack(f.read(ENTRY.size))
+            length = ENTRY.size + header_len + payload_len
+            if magic != ENTRY_MAGIC or offset + length > size:
+                break
+            header = json.loads(f.read(header_len))
+            records.append((header['timestamp'], offset, length, file_key(header['file'])))
+            offset += length
+        return records, offset
+
+    def _complete(self):
+        # (records of the complete entries, end of the last one, whether the
+        # journal and index on disk are exactly those), without writing: a
+        # crash can leave the index behind the journal or a torn last entry
+        records = self._read_index()
+        index_size = os.path.getsize(self.index_path) if os.path.isfile(self.index_path) else 0
+        size = os.path.getsize(self.path)
+        end = records[-1][1] + records[-1][2] if records else len(JOURNAL_MAGIC)
+        if end == size and index_size == len(records) * INDEX_RECORD.size:
+            return records, end, True
+
+        with open(self.path, 'rb') as f:
+            if f.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+                raise ValueError(f"{self.path} is not a change journal")
+            if end > size:
+                records, end = [], len(JOURNAL_MAGIC)
+            missing, end = self._scan(f, end)
+        return records + missing, end, False
+
+    def records(self):
+        # The index of the complete entries; read-only, a stale index or torn
+        # entry is only repaired on disk by appending()
+        if not os.path.isfile(self.path):
+            return []
+        return self._complete()[0]
+
+    @contextmanager
+    def _locked(self):
+        # Only one writer at a time: appending() truncates and rewrites
+        lock_path = self.path + '.lock'
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise RuntimeError(
+                f"{lock_path} exists: another change_logger is writing {self.path}"
+                " (delete the lock file if it crashed)"
+            ) from None
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            yield
+        finally:
+            os.remove(lock_path)
+
+    def _repair(self):
+        # Drop a torn last entry and bring the index in line with the journal
+        records, end, intact = self._complete()
+        if not intact:
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+            with open(self.index_path, 'wb') as f:
+                f.write(b''.join(INDEX_RECORD.pack(*r) for r in records))
+        return records
+
+    @contextmanager
+    def appending(self):
+        # Yields add(file, kind, lines, base_hash, new_hash, **extra); the
+        # journal and index are flushed to disk once, when the block ends
+        with self._locked():
+            new = not os.path.isfile(self.path)
+            records = [] if new else self._repair()
+            last_timestamp = records[-1][0] if records else 0.0
+            with open(self.path, 'ab') as journal, open(self.index_path, 'ab') as index:
+                if new:
+                    journal.write(JOURNAL_MAGIC)
+                offset = journal.tell()
+
+                def add(file, kind, lines=(), base_hash=None, new_hash=None, **extra):
+                    nonlocal offset, last_timestamp
+                    payload, hunks = entry_payload(lines)
+                    last_timestamp = max(time.time(), last_timestamp)
+                    header = json.dumps({
+                        'file': file,
+                        'timestamp': last_timestamp,
+                        'kind': kind,
+                        'base_hash': base_hash,
+                        'new_hash': new_hash,
+                        'hunks': hunks,
+                        **extra,
+                    }, separators=(',', ':')).encode('utf-8')
+
+                    journal.write(ENTRY.pack(ENTRY_MAGIC, len(header), len(payload)) + header + payload)
+                    length = ENTRY.size + len(header) + len(payload)
+                    index.write(INDEX_RECORD.pack(last_timestamp, offset, length, file_key(file)))
+                    offset += length
+
+                yield add
+                for f in (journal, index):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def read_entry(self, f, offset):
+        f.seek(offset)
+        magic, header_len, payload_len = ENTRY.unpack(f.read(ENTRY.size))
+        if magic != ENTRY_MAGIC:
+            raise ValueError(f"No journal entry at offset {offset} of {self.path}")
+        header = json.loads(f.read(header_len))
+        return header, f.read(payload_len).decode('utf-8')
+
+    def entries(self, file=None, since=None, until=None):
+        # (header, payload) of the entries for `file` (all files if None)
+        # with since <= timestamp < until, oldest first
+        records = self.records()
+        timestamps = [r[0] for r in records]
+        lo = bisect.bisect_left(timestamps, since) if since is not None else 0
+        hi = bisect.bisect_left(timestamps, until) if until is not None else len(records)
+        key = file_key(file) if file is not None else None
+
+        with open(self.path, 'rb') as f:
+            for _, offset, _, entry_key in records[lo:hi]:
+                if key is not None and entry_key != key:
+                    continue
+                header, payload = self.read_entry(f, offset)
+                if file is None or header['file'] == file:
+                    yield header, payload
+
+def format_entry(header, payload):
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['timestamp']))
+    return f"{stamp} {header['kind']} {header['file']}\n{payload}"
+
+def log_changes(dir_path, log_path, snapshot, store_dir, workers=DEFAULT_WORKERS,
+                path_filter=None, skip=(), large_file_bytes=LARGE_FILE_BYTES):
+    # Implement change logging
+    # Only files whose hash differs from the snapshot are decoded and diffed;
+    # the previous version comes from the object store, which holds every
+    # version the snapshot references (see prune_store). Diffs are CPU bound
+    # and run in worker processes,
+    # a bounded number at a time, and are appended to the journal at log_path
+    # in file name order
+    new_snapshot = build_index(dir_path, snapshot, store_dir, workers, path_filter, skip)
+
+    changed = [
+        (store_dir, file, snapshot.get(file), entry, large_file_bytes)
+        for file, entry in new_snapshot.items()
+        if file not in snapshot or entry['hash'] != snapshot[file]['hash']
+    ]
+    # Files that merely fell out of the include/exclude rules are not deletions
+    deleted = deque(sorted(
+        file for file in snapshot.keys() - new_snapshot.keys()
+        if not os.path.lexists(os.path.join(dir_path, file))
+    ))
+
+    if workers > 1 and len(changed) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(changed)))
+    else:
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    with executor, ChangeJournal(log_path).appending() as add:
+        diffs = ordered_map(executor, diff_entry, changed, 2 * max(1, workers))
+
+        # Both streams are already sorted by file name; merge them
+        for (_, file, old_entry, entry, _), diff in zip(changed, diffs):
+            while deleted and deleted[0] < file:
+                file_deleted = deleted.popleft()
+                add(file_deleted, 'deleted', base_hash=snapshot[file_deleted]['hash'])
+
+            base_hash = old_entry['hash'] if old_entry is not None else None
+            if old_entry is None:
+                add(file, 'added', diff, None, entry['hash'])
+            elif diff is None:
+                add(file, 'modified', (), base_hash, entry['hash'], note='previous version not in the store')
+            elif diff:
+                add(file, 'modified', diff, base_hash, entry['hash'])
+        for file in deleted:
+            add(file, 'deleted', base_hash=snapshot[file]['hash'])
 
     return new_snapshot
 
-def initialize_snapshot(dir_path, snapshot_path):
-    snapshot = {}
-    for file in os.listdir(dir_path):
-        filepath = os.path.join(dir_path, file)
-        if os.path.isfile(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    snapshot[file] = f.read()
-            except UnicodeDecodeError:
-                with open(filepath, 'r', encoding='latin-1') as f:
-                    snapshot[file] = f.read()
-
-    with open(snapshot_path, 'wb') as f:
-        pickle.dump(snapshot, f)
+def initialize_snapshot(dir_path, snapshot_path, workers=DEFAULT_WORKERS, path_filter=None, skip=()):
+    index = build_index(dir_path, {}, store_dir_for(snapshot_path), workers, path_filter,
+                        (snapshot_path, snapshot_path + '.tmp', *skip))
+    save_snapshot(snapshot_path, index)
+
+def clear_snapshot(snapshot_path):
+    # Remove an index and its object store
+    if os.path.isfile(snapshot_path):
+        os.remove(snapshot_path)
+    shutil.rmtree(store_dir_for(snapshot_path), ignore_errors=True)
 
 def main():
     import argparse
-    parser = argparse.ArgumentParser(description="Log changes to text files.")
+    from datetime import datetime
+    parser = argparse.ArgumentParser(description="Log changes to text files (recursively).")
     parser.add_argument('dir_path', type=str, help="Directory of text files")
-    parser.add_argument('log_path', type=str, help="Path to log file")
-    parser.add_argument('snapshot_path', type=str, help="Path to previous snapshot")
+    parser.add_argument('log_path', type=str, help="Path to the change journal (appended to)")
+    parser.add_argument('snapshot_path', type=str, help="Path to previous snapshot index (JSON)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Parallel hashing/diffing workers (default: CPU cores)")
+    parser.add_argument('--large-file-mb', type=float, default=LARGE_FILE_BYTES / 2 ** 20,
+                        help="Diff files at least this large from memory maps, chunk by chunk")
+    parser.add_argument('--include', action='append', default=[],
+                        help="Only log files matching this pattern, e.g. '*.txt' (repeatable)")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help="Skip paths matching this .gitignore-style pattern (repeatable)")
+    parser.add_argument('--ignore-file', type=str, default=None,
+                        help="Ignore file to honour (default: <dir_path>/.gitignore if present)")
+    parser.add_argument('--no-default-excludes', action='store_true',
+                        help="Also scan caches and binary files (.git, __pycache__, *.zip, ...)")
+    parser.add_argument('--keep-history', action='store_true',
+                        help="Keep every stored version of every file (the store then grows without bound)")
+    parser.add_argument('--show', nargs='?', const='', default=None, metavar='FILE',
+                        help="Print the journal (only FILE's entries if given) instead of scanning")
+    parser.add_argument('--since', type=str, default=None,
+                        help="With --show, entries from this time on (YYYY-MM-DD[THH:MM[:SS]])")
+    parser.add_argument('--until', type=str, default=None,
+                        help="With --show, entries before this time")
 
     args = parser.parse_args()
 
-    if os.path.isfile(args.snapshot_path):
-        with open(args.snapshot_path, 'rb') as f:
-            prev_snapshot = pickle.load(f)
-    else:
-        initialize_snapshot(args.dir_path, args.snapshot_path)
-        prev_snapshot = {}
+    try:
+        # Check the journal first (read-only, --show must not modify it):
+        # failing after the scan would leave the store filled and the
+        # snapshot unsaved
+        ChangeJournal(args.log_path).records()
+    except ValueError as e:
+        parser.error(f"{e} (the previous version wrote a text log); pass a new journal path")
+
+    if args.show is not None:
+        bounds = [
+            datetime.fromisoformat(value).timestamp() if value else None
+            for value in (args.since, args.until)
+        ]
+        for header, payload in ChangeJournal(args.log_path).entries(args.show or None, *bounds):
+            print(format_entry(header, payload))
+        return
+    if os.path.exists(args.log_path + '.lock'):
+        parser.error(f"{args.log_path}.lock exists: another change_logger is writing the journal"
+                     " (delete the lock file if it crashed)")
+
+    store_dir = store_dir_for(args.snapshot_path)
+    path_filter = make_filter(args.dir_path, args.include, args.exclude, args.ignore_file,
+                              not args.no_default_excludes)
+    skip = (args.snapshot_path, args.snapshot_path + '.tmp', args.log_path, args.log_path + '.idx',
+            args.log_path + '.lock')
+
+    if not os.path.isfile(args.snapshot_path):
+        # First run: record the baseline, there is nothing to compare against
+        initialize_snapshot(args.dir_path, args.snapshot_path, args.workers, path_filter, skip)
+        if not args.keep_history:
+            prune_store(store_dir, load_snapshot(args.snapshot_path))
+        print(f"Snapshot initialized at {args.snapshot_path}")
+        return
 
-    new_snapshot = log_changes(args.dir_path, args.log_path, prev_snapshot)
+    try:
+        prev_snapshot = load_snapshot(args.snapshot_path)
+    except ValueError as e:
+        parser.error(str(e))
+    new_snapshot = log_changes(args.dir_path, args.log_path, prev_snapshot, store_dir,
+                               args.workers, path_filter, skip, int(args.large_file_mb * 2 ** 20))
 
-    with open(args.snapshot_path, 'wb') as f:
-        pickle.dump(new_snapshot, f)
+    save_snapshot(args.snapshot_path, new_snapshot)
+    # Once the new index is saved, versions only the old one referenced go
+    if not args.keep_history:
+        prune_store(store_dir, new_snapshot)
 
 if __name__ == "__main__":
     main()
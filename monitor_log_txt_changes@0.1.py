@@ -1,104 +1,661 @@
 import time
 import os
 import sys
+import re
+import json
+import zlib
+import queue
+import struct
+import shutil
+import fnmatch
+import hashlib
+import tempfile
+import heapq
+import difflib
+import signal
+import argparse
+import threading
+import importlib.util
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+ENCODING_SAMPLE = 64 * 1024
+DEFAULT_DEBOUNCE = 0.5  # seconds
+# Below this many differing lines the matcher skips the autojunk heuristic,
+# which trades minimality for speed on large inputs
+AUTOJUNK_LINES = 2000
+DEFAULT_CACHE_MB = 64
+DEFAULT_SUFFIXES = ('.txt',)
+STOP_FILE = 'stop_file.txt'
+DEFAULT_FLUSH_KB = 64
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_SEED_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+# File system timestamps lag time.time_ns() (coarse clocks, 2 s on FAT)
+MTIME_SLACK_NS = 2 * 10 ** 9
+LINE_HASH_SIZE = 8
+
+# Persisted baselines: BASELINE_MAGIC, then per file RECORD (path and blob
+# lengths), the UTF-8 absolute path and a packed Baseline
+BASELINE_MAGIC = b'MONB1\n'
+RECORD = struct.Struct('<IQ')
+
+def load_change_logger():
+    # Encoding detection is shared with change_logger@0.0.py; the '@' in its
+    # name rules out a plain import, so load it from its path next to this script
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'change_logger@0.0.py')
+    spec = importlib.util.spec_from_file_location('change_logger', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+detect_encoding = load_change_logger().detect_encoding
+
+def read_lines(filepath):
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    try:
+        text = data.decode(detect_encoding(data[:ENCODING_SAMPLE]))
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    return text.splitlines(keepends=True)
+
+class CoalescingQueue:
+    # Paths waiting to be processed, each due `debounce` seconds after its
+    # last event. Re-queueing a waiting path only pushes its deadline back,
+    # so a burst of events on one file yields a single job
+    def __init__(self, debounce=DEFAULT_DEBOUNCE):
+        self.debounce = debounce
+        self._due = {}       # path -> deadline
+        self._heap = []      # (deadline, path), stale entries skipped on pop
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, path):
+        with self._cond:
+            deadline = time.monotonic() + self.debounce
+            self._due[path] = deadline
+            heapq.heappush(self._heap, (deadline, path))
+            self._cond.notify()
+
+    def get(self):
+        # Next due path, blocking until there is one; None once closed and
+        # empty. After close, waiting paths are returned without delay
+        with self._cond:
+            while True:
+                while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                    heapq.heappop(self._heap)
+                if self._heap:
+                    deadline, path = self._heap[0]
+                    wait = deadline - time.monotonic()
+                    if wait <= 0 or self._closed:
+                        heapq.heappop(self._heap)
+                        del self._due[path]
+                        return path
+                elif self._closed:
+                    return None
+                else:
+                    wait = None
+                self._cond.wait(wait)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+def line_hashes(lines):
+    return b''.join(
+        hashlib.blake2b(line.encode('utf-8', 'surrogatepass'), digest_size=LINE_HASH_SIZE).digest()
+        for line in lines
+    )
+
+class Baseline:
+    # Compact last-seen version of a file: per-line hashes, to tell cheaply
+    # whether (and where) it changed, the zlib-compressed text, and the size
+    # and mtime it was read at
+    __slots__ = ('hashes', 'compressed', 'size', 'mtime_ns')
+    HEADER = struct.Struct('<qqQ')  # size, mtime_ns, length of hashes
+
+    def __init__(self, hashes, compressed, size=-1, mtime_ns=-1):
+        self.hashes = hashes
+        self.compressed = compressed
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @classmethod
+    def from_lines(cls, lines, hashes=None, st=None):
+        text = ''.join(lines).encode('utf-8', 'surrogatepass')
+        return cls(
+            hashes if hashes is not None else line_hashes(lines),
+            zlib.compress(text, 6),
+            st.st_size if st is not None else -1,
+            st.st_mtime_ns if st is not None else -1,
+        )
+
+    def lines(self):
+        return zlib.decompress(self.compressed).decode('utf-8', 'surrogatepass').splitlines(keepends=True)
+
+    def matches_stat(self, st):
+        return (self.size, self.mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+    def pack(self):
+        return self.HEADER.pack(self.size, self.mtime_ns, len(self.hashes)) + self.hashes + self.compressed
+
+    @classmethod
+    def unpack(cls, data):
+        size, mtime_ns, n = cls.HEADER.unpack_from(data)
+        start = cls.HEADER.size
+        return cls(data[start:start + n], data[start + n:], size, mtime_ns)
+
+    @property
+    def nbytes(self):
+        return len(self.hashes) + len(self.compressed) + 200
+
+class BaselineCache:
+    # Baselines of the monitored files, keyed by absolute path, kept in
+    # memory up to `max_bytes` (least recently used first out); evicted
+    # baselines are written to `store_dir` and read back when their file
+    # changes again
+    def __init__(self, max_bytes=DEFAULT_CACHE_MB * 2 ** 20, store_dir=None):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.spilled = set()
+        self.nbytes = 0
+        self.owns_store = store_dir is None
+        self.store_dir = store_dir or tempfile.mkdtemp(prefix='monitor_baselines_')
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def _disk_path(self, path):
+        return os.path.join(self.store_dir, hashlib.sha1(path.encode('utf-8')).hexdigest())
+
+    def _spill(self, path, baseline):
+        with open(self._disk_path(path), 'wb') as f:
+            f.write(baseline.pack())
+
+    def _load(self, path):
+        try:
+            with open(self._disk_path(path), 'rb') as f:
+                return Baseline.unpack(f.read())
+        except FileNotFoundError:
+            return None
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        with self.lock:
+            baseline = self.entries.get(path)
+            if baseline is not None:
+                self.entries.move_to_end(path)
+                return baseline
+            if path not in self.spilled:
+                return None
+        return self._load(path)
+
+    def put(self, path, baseline):
+        path = os.path.abspath(path)
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.entries[path] = baseline
+            self.nbytes += baseline.nbytes
+
+            evicted = []
+            while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                evicted_path, evicted_baseline = self.entries.popitem(last=False)
+                self.nbytes -= evicted_baseline.nbytes
+                evicted.append((evicted_path, evicted_baseline))
+        for evicted_path, evicted_baseline in evicted:
+            self._spill(evicted_path, evicted_baseline)
+            with self.lock:
+                self.spilled.add(evicted_path)
+
+    def paths(self):
+        with self.lock:
+            return sorted(self.spilled | set(self.entries))
+
+    def save(self, baseline_file):
+        # Write every baseline (memory and spilled) to one file, atomically
+        tmp_path = baseline_file + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(BASELINE_MAGIC)
+            for path in self.paths():
+                baseline = self.get(path)
+                if baseline is None:
+                    continue
+                key, blob = path.encode('utf-8'), baseline.pack()
+                f.write(RECORD.pack(len(key), len(blob)) + key + blob)
+        os.replace(tmp_path, baseline_file)
+
+    def close(self):
+        if self.owns_store:
+            shutil.rmtree(self.store_dir, ignore_errors=True)
+
+def read_baseline_file(baseline_file):
+    # (absolute path, Baseline) records of a saved baseline file, one at a
+    # time so a large file is never held in memory at once
+    with open(baseline_file, 'rb') as f:
+        if f.read(len(BASELINE_MAGIC)) != BASELINE_MAGIC:
+            raise ValueError(f"{baseline_file} is not a monitor baseline file")
+        while True:
+            prefix = f.read(RECORD.size)
+            if len(prefix) < RECORD.size:
+                return
+            key_len, blob_len = RECORD.unpack(prefix)
+            key, blob = f.read(key_len), f.read(blob_len)
+            if len(blob) < blob_len:
+                return
+            yield key.decode('utf-8'), Baseline.unpack(blob)
+
+def scan_roots(roots, matcher, recursive=True):
+    # (path, stat) of the files to monitor under the roots, via os.scandir
+    stack = list(roots)
+    while stack:
+        directory = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.is_file() and matcher.matches(entry.path):
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+class PathMatcher:
+    # Which files to monitor, compiled once: a path matches if it ends with
+    # one of `suffixes` or (relative to its watch root) matches one of the
+    # fnmatch-style `globs`. `exclude` paths (e.g. the log itself) never match
+    def __init__(self, roots, suffixes=DEFAULT_SUFFIXES, globs=(), exclude=()):
+        self.roots = sorted((os.path.abspath(r) for r in roots), key=len, reverse=True)
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.glob_regex = re.compile('|'.join(fnmatch.translate(g) for g in globs)) if globs else None
+        self.exclude = {os.path.abspath(p) for p in exclude}
+        self.stop_files = {os.path.join(r, STOP_FILE) for r in self.roots}
+
+    def relative(self, path):
+        for root in self.roots:
+            if path.startswith(root + os.sep):
+                return path[len(root) + 1:].replace(os.sep, '/')
+        return os.path.basename(path)
+
+    def matches(self, path):
+        path = os.path.abspath(path)
+        if path in self.exclude or path in self.stop_files:
+            return False
+        if self.suffixes and path.lower().endswith(self.suffixes):
+            return True
+        return self.glob_regex is not None and self.glob_regex.match(self.relative(path)) is not None
+
+def format_record(record):
+    # Text form of a change record, as the monitor has always logged it
+    out = [f"\nModified file: {record['file']} at {record['time']}\n"]
+    for change in record['changes']:
+        if change['old'] is None:
+            out.append(f"Line {change['line']}: Added: {change['new']}\n")
+        elif change['new'] is None:
+            out.append(f"Line {change['line']}: Deleted: {change['old']}\n")
+        else:
+            out.append(f"Line {change['line']}: Old: {change['old']} | New: {change['new']}\n")
+    # Log the replacement code
+    for old_text, new_text in record['replacements']:
+        out.append(f'Replacement code: str.replace("{old_text}", "{new_text}")\n')
+    return ''.join(out)
+
+class LogWriter:
+    # Appends change records to the log from a dedicated thread. The log is
+    # opened once; records are rendered (text or JSONL) into a buffer that is
+    # written with a single write() once it holds `flush_bytes` or its oldest
+    # record is `flush_interval` seconds old
+    _CLOSE = object()
+
+    def __init__(self, log_file, jsonl=False, flush_bytes=DEFAULT_FLUSH_KB * 1024,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.log_file = log_file
+        self.jsonl = jsonl
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._queue.put(record)
+
+    def flush(self):
+        # Block until everything written so far is on disk
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        buffer, size, deadline = [], 0, None
+        with open(self.log_file, 'a', encoding='utf-8') as log:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if isinstance(item, dict):
+                    text = json.dumps(item) + '\n' if self.jsonl else format_record(item)
+                    buffer.append(text)
+                    size += len(text)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    # A steady stream never lets get() time out, so check the
+                    # interval here too
+                    if size < self.flush_bytes and time.monotonic() < deadline:
+                        continue
+
+                # Size or time threshold reached, flush requested, or closing
+                if buffer:
+                    log.write(''.join(buffer))
+                    log.flush()
+                    buffer, size, deadline = [], 0, None
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is self._CLOSE:
+                    return
+
 class FileChangeHandler(FileSystemEventHandler):
-    def __init__(self, log_file, monitored_folder):
+    # Watchdog callbacks only queue paths; a worker thread (see run_worker)
+    # reads, compares and logs each file once per burst of events
+    def __init__(self, log_file, monitored_folder, debounce=DEFAULT_DEBOUNCE,
+                 cache_bytes=DEFAULT_CACHE_MB * 2 ** 20, baseline_dir=None,
+                 suffixes=DEFAULT_SUFFIXES, globs=(), jsonl=False,
+                 flush_bytes=DEFAULT_FLUSH_KB * 1024, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        # monitored_folder: one folder or a list of them
+        roots = [monitored_folder] if isinstance(monitored_folder, str) else list(monitored_folder)
         self.log_file = log_file
-        self.monitored_folder = monitored_folder
-        self.stop_file = os.path.join(monitored_folder, 'stop_file.txt')
-        self.file_contents = {}  # Dictionary to keep track of file contents
+        self.monitored_folder = roots[0]
+        self.roots = roots
+        self.matcher = PathMatcher(roots, suffixes, globs, exclude=[log_file])
+        self.file_contents = BaselineCache(cache_bytes, baseline_dir)  # Last seen version of each file
+        self.queue = CoalescingQueue(debounce)
+        self.writer = LogWriter(log_file, jsonl, flush_bytes, flush_interval)
+        self.stop_requested = threading.Event()
+        self.stop_reason = None
+
+    def request_stop(self, reason):
+        if not self.stop_requested.is_set():
+            self.stop_reason = reason
+            self.stop_requested.set()
+
+    def enqueue(self, path):
+        # The stop file is recognised from its own event, no per-event stat
+        if os.path.abspath(path) in self.matcher.stop_files:
+            self.request_stop(f"{path} was detected")
+        # Check if the modified file is one we monitor
+        elif self.matcher.matches(path) and not self.stop_requested.is_set():
+            self.queue.put(path)
 
     def on_modified(self, event):
-        if event.is_directory:
-            return
+        if not event.is_directory:
+            self.enqueue(event.src_path)
 
-        # Check if the modified file is a .txt file
-        if event.src_path.endswith('.txt'):
-            # Check if the stop file exists
-            if os.path.exists(self.stop_file):
-                print(f"Stopping monitoring as {self.stop_file} was detected.")
-                return
+    def on_created(self, event):
+        if not event.is_directory:
+            self.enqueue(event.src_path)
 
-            # Read the current content of the file
+    def on_moved(self, event):
+        # Editors that save by writing a temporary file and renaming it
+        if not event.is_directory:
+            self.enqueue(event.dest_path)
+
+    def shutdown(self, observer, worker, baseline_file=None):
+        # Stop watching, process what is still queued, flush the log and
+        # save the baselines for the next run
+        observer.stop()
+        observer.join()
+        self.queue.close()
+        worker.join()
+        self.writer.close()
+        if baseline_file is not None:
+            self.file_contents.save(baseline_file)
+        self.file_contents.close()
+
+    def seed_baselines(self, recursive=True, workers=DEFAULT_SEED_WORKERS, baseline_file=None,
+                       watch_started_ns=None):
+        # Record a baseline for every monitored file before the worker starts,
+        # so first events are diffed against real content. Baselines saved by
+        # the last run are reused for files whose size and mtime still match;
+        # files changed in between keep their saved baseline and are queued,
+        # so the edits made while nobody was watching get logged. The other
+        # files are read and compressed on a thread pool.
+        # A file written after watching began (watch_started_ns) may already
+        # hold an edit whose event is queued; a baseline read from it would
+        # make that event compare equal and the edit vanish. Such files get
+        # no baseline and are queued, so the edit is logged (as the whole
+        # file) instead of lost. Returns (read, reused, changed, unsettled)
+        if watch_started_ns is None:
+            watch_started_ns = time.time_ns()
+        settled_before = watch_started_ns - MTIME_SLACK_NS
+        files = {os.path.abspath(path): (path, st) for path, st in scan_roots(self.roots, self.matcher, recursive)}
+        reused = changed = 0
+        if baseline_file is not None and os.path.isfile(baseline_file):
+            for key, baseline in read_baseline_file(baseline_file):
+                if key not in files:
+                    continue
+                path, st = files.pop(key)
+                self.file_contents.put(path, baseline)
+                if baseline.matches_stat(st):
+                    reused += 1
+                else:
+                    self.queue.put(path)
+                    changed += 1
+
+        def seed(item):
+            path, st = item
             try:
-                with open(event.src_path, 'r', encoding='utf-8') as f:
-                    new_content = f.readlines()
-            except UnicodeDecodeError as e:
-                print(f"Error reading file {event.src_path}: {e}")
+                lines = read_lines(path)
+                after = os.stat(path)
+            except OSError:
+                return False
+            if (after.st_size, after.st_mtime_ns) != (st.st_size, st.st_mtime_ns) or after.st_mtime_ns >= settled_before:
+                self.queue.put(path)
+                return True
+            self.file_contents.put(path, Baseline.from_lines(lines, st=st))
+            return False
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            unsettled = sum(pool.map(seed, files.values()))
+        return len(files), reused, changed, unsettled
+
+    def run_worker(self):
+        while True:
+            path = self.queue.get()
+            if path is None:
                 return
+            try:
+                self.process_file(path)
+            except Exception as e:
+                print(f"Error processing {path}: {e}")
+
+    def process_file(self, path):
+        if not os.path.isfile(path):
+            return
 
-            # Compare with previous content and log differences
-            old_content = self.file_contents.get(event.src_path, [])
-            changes = self.compare_lines(old_content, new_content)
-            
-            if changes:
-                # Log changes to the log file
-                with open(self.log_file, 'a', encoding='utf-8') as log:
-                    log.write(f"\nModified file: {event.src_path} at {time.ctime()}\n")
-                    
-                    # Dictionary to track all replacements
-                    replacement_code = {}
-                    
-                    for line_number, old_line, new_line in changes:
-                        log.write(f"Line {line_number}: Old: {old_line.strip()} | New: {new_line.strip()}\n")
-                        
-                        # Track replacements
-                        if old_line.strip() and new_line.strip() and old_line.strip() != new_line.strip():
-                            old_text = old_line.strip()
-                            new_text = new_line.strip()
-                            if old_text not in replacement_code:
-                                replacement_code[old_text] = new_text
-
-                    # Log the replacement code
-                    for old_text, new_text in replacement_code.items():
-                        replace_code = f'str.replace("{old_text}", "{new_text}")'
-                        log.write(f"Replacement code: {replace_code}\n")
-
-            # Update the stored content
-            self.file_contents[event.src_path] = new_content
+        # Read the current content of the file once, as bytes, and decode
+        # it with the encoding detected from its first bytes
+        try:
+            st = os.stat(path)
+            new_content = read_lines(path)
+        except OSError as e:
+            print(f"Error reading file {path}: {e}")
+            return
+
+        # Compare with previous content and log differences
+        # Unchanged line hashes mean nothing to log, and the stored
+        # baseline need not even be decompressed
+        new_hashes = line_hashes(new_content)
+        baseline = self.file_contents.get(path)
+        if baseline is not None and baseline.hashes == new_hashes:
+            if not baseline.matches_stat(st):
+                baseline.size, baseline.mtime_ns = st.st_size, st.st_mtime_ns
+                self.file_contents.put(path, baseline)
+            return
+        old_content = baseline.lines() if baseline is not None else []
+        changes = self.compare_lines(old_content, new_content)
+
+        if changes:
+            # Hand the changes to the log writer thread
+            records = []
+
+            # Dictionary to track all replacements
+            replacement_code = {}
+
+            for line_number, old_line, new_line in changes:
+                old_text = old_line.strip() if old_line is not None else None
+                new_text = new_line.strip() if new_line is not None else None
+                records.append({'line': line_number, 'old': old_text, 'new': new_text})
+
+                # Track replacements
+                if old_text and new_text and old_text != new_text and old_text not in replacement_code:
+                    replacement_code[old_text] = new_text
+
+            self.writer.write({
+                'file': path,
+                'time': time.ctime(),
+                'timestamp': time.time(),
+                'changes': records,
+                'replacements': list(replacement_code.items()),
+            })
+
+        # Update the stored content
+        self.file_contents.put(path, Baseline.from_lines(new_content, new_hashes, st))
 
     def compare_lines(self, old_lines, new_lines):
+        # Minimal line diff as (line_number, old_line, new_line) records: old_line
+        # None is an added line, new_line None a deleted one (numbered in the old
+        # file), both set a replaced line. Inserting one line yields one record
+        # Trim the common head and tail before matching
+        shortest = min(len(old_lines), len(new_lines))
+        start = 0
+        while start < shortest and old_lines[start] == new_lines[start]:
+            start += 1
+        suffix = 0
+        while suffix < shortest - start and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+            suffix += 1
+        old_mid = old_lines[start:len(old_lines) - suffix]
+        new_mid = new_lines[start:len(new_lines) - suffix]
+
+        matcher = difflib.SequenceMatcher(
+            None, old_mid, new_mid,
+            autojunk=max(len(old_mid), len(new_mid)) > AUTOJUNK_LINES
+        )
         changes = []
-        max_len = max(len(old_lines), len(new_lines))
-        
-        for i in range(max_len):
-            old_line = old_lines[i] if i < len(old_lines) else ''
-            new_line = new_lines[i] if i < len(new_lines) else ''
-            
-            if old_line != new_line:
-                # Record the change, including the code for replacement
-                changes.append((i + 1, old_line, new_line))
-        
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+            for k in range(paired):
+                changes.append((start + j1 + k + 1, old_mid[i1 + k], new_mid[j1 + k]))
+            for k in range(i1 + paired, i2):
+                changes.append((start + k + 1, old_mid[k], None))
+            for k in range(j1 + paired, j2):
+                changes.append((start + k + 1, None, new_mid[k]))
+
         return changes
 
 if __name__ == "__main__":
-    # Check if the correct number of arguments are provided
-    if len(sys.argv) != 3:
-        print("Usage: python monitor_files.py <folder_to_watch> <log_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Log line changes to text files in one or more folders.")
+    parser.add_argument('folder_to_watch', help="Folder to monitor")
+    parser.add_argument('log_file', help="Log file to append changes to")
+    parser.add_argument('--root', action='append', default=[],
+                        help="Another folder to monitor in the same process (repeatable)")
+    parser.add_argument('--suffix', action='append', default=None,
+                        help="File suffix to monitor (repeatable, default: .txt)")
+    parser.add_argument('--glob', action='append', default=[],
+                        help="Also monitor paths matching this pattern relative to their root, e.g. 'notes/*.md'")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="Only watch the top level of each folder")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help="Seconds a file must be quiet before it is compared (default: %(default)s)")
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                        help="Memory for file baselines before they spill to disk (default: %(default)s)")
+    parser.add_argument('--baseline-dir', default=None,
+                        help="Where spilled baselines go (default: a temporary directory)")
+    parser.add_argument('--baseline-file', default=None,
+                        help="Load baselines from this file at start and save them to it on exit")
+    parser.add_argument('--seed-workers', type=int, default=DEFAULT_SEED_WORKERS,
+                        help="Threads reading files for the initial baselines (default: %(default)s)")
+    parser.add_argument('--no-seed', action='store_true',
+                        help="Start with no baselines (the first change to a file logs all of it)")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="Write the log as JSON lines, one record per changed file")
+    parser.add_argument('--flush-kb', type=float, default=DEFAULT_FLUSH_KB,
+                        help="Write the log buffer once it holds this much (default: %(default)s)")
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Write the log buffer at least this often, in seconds (default: %(default)s)")
+    args = parser.parse_args()
+
+    folders_to_watch = [args.folder_to_watch, *args.root]  # Folder paths provided by the user
+    log_file = args.log_file                                # Log file path provided by the user
 
-    folder_to_watch = sys.argv[1]  # Folder path provided by the user
-    log_file = sys.argv[2]         # Log file path provided by the user
+    # Check if the folders exist
+    for folder in folders_to_watch:
+        if not os.path.isdir(folder):
+            print(f"The folder {folder} does not exist.")
+            sys.exit(1)
 
-    # Check if the folder exists
-    if not os.path.isdir(folder_to_watch):
-        print(f"The folder {folder_to_watch} does not exist.")
+    event_handler = FileChangeHandler(log_file, folders_to_watch, args.debounce,
+                                      int(args.cache_mb * 2 ** 20), args.baseline_dir,
+                                      tuple(args.suffix) if args.suffix else DEFAULT_SUFFIXES, args.glob,
+                                      args.jsonl, int(args.flush_kb * 1024), args.flush_interval)
+    existing = [f for f in event_handler.matcher.stop_files if os.path.exists(f)]
+    if existing:
+        print(f"Remove {existing[0]} before starting the monitor.")
         sys.exit(1)
 
-    event_handler = FileChangeHandler(log_file, folder_to_watch)
+    # One observer (and one event thread) for all folders. It starts before
+    # seeding so no change is missed; events queue up until the worker runs
+    watch_started_ns = time.time_ns()
     observer = Observer()
-    observer.schedule(event_handler, path=folder_to_watch, recursive=False)
+    for folder in folders_to_watch:
+        observer.schedule(event_handler, path=folder, recursive=not args.no_recursive)
     observer.start()
 
-    print(f"Monitoring changes in {folder_to_watch}. Logging to {log_file}")
-    print(f"To stop monitoring, create a file named 'stop_file.txt' in the monitored folder.")
+    if not args.no_seed:
+        start = time.perf_counter()
+        read, reused, changed, unsettled = event_handler.seed_baselines(
+            not args.no_recursive, args.seed_workers, args.baseline_file, watch_started_ns
+        )
+        print(f"Baselines: {read} files read, {reused} reused from {args.baseline_file}, "
+              f"{changed} changed since last run ({time.perf_counter() - start:.1f}s)"
+              if args.baseline_file else
+              f"Baselines: {read} files read ({time.perf_counter() - start:.1f}s)")
+        if unsettled:
+            print(f"{unsettled} files were written while starting up; their first "
+                  f"record holds the whole file")
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+    worker = threading.Thread(target=event_handler.run_worker, name="change-worker", daemon=True)
+    worker.start()
+
+    # Signals only set the stop event; the main thread does the shutdown
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name),
+                          lambda signum, frame: event_handler.request_stop(f"{signal.Signals(signum).name} received"))
+
+    print(f"Monitoring changes in {', '.join(folders_to_watch)}. Logging to {log_file}")
+    print(f"To stop monitoring, create a file named '{STOP_FILE}' in a monitored folder.")
+
+    # Block until stopped. Windows cannot interrupt a lock wait with Ctrl+C,
+    # so there the wait wakes up now and then for the signal handler to run
+    while not event_handler.stop_requested.wait(None if os.name != 'nt' else 1.0):
+        pass
+
+    print(f"Stopping monitoring as {event_handler.stop_reason}.")
+    event_handler.shutdown(observer, worker, args.baseline_file)